@@ -11,19 +11,34 @@ PlantDeck RAG API — FastAPI server that:
 
 import os
 import json
+import asyncio
+import hashlib
+import math
+import mmap
 import pickle
+import queue
+import re
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures import Future
 from pathlib import Path
 from typing import List, Tuple
 
+import httpx
 import numpy as np
-import requests
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse, RedirectResponse, Response
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from starlette.background import BackgroundTask
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from sentence_transformers import SentenceTransformer
 
+from app.topk import topk_rows
+
 # ---------- paths / config ----------
 DB = "data/plants.db"
 
@@ -33,7 +48,16 @@ MAP_PKL = "build/emb_map.pkl"
 
 # page-level index (from tools/build_page_index.py)
 PAGE_EMB_NPY = "build/page_embeddings.npy"
-PAGE_MAP_PKL = "build/page_map.pkl"
+PAGE_META_DIR = "build/page_meta"  # columnar pdf/page/snippet arrays (memory-mapped)
+PAGE_MAP_PKL = "build/page_map.pkl"  # legacy pickled list from older builds
+PAGE_IVF_NPZ = "build/page_ivf.npz"  # optional IVF index over page_embeddings.npy
+PAGE_NPROBE = int(os.environ.get("PAGE_NPROBE", "16"))  # IVF lists scanned per query; <=0 = exact
+PAGE_FTS_DB = "build/page_fts.db"  # FTS5 over chunk text (rowid = page row)
+
+# hybrid retrieval: BM25 (SQLite FTS5) + cosine, fused with reciprocal-rank fusion
+HYBRID = os.environ.get("HYBRID", "1") != "0"
+RRF_K = int(os.environ.get("RRF_K", "60"))
+FUSE_DEPTH = 4  # each ranking contributes k * FUSE_DEPTH candidates to the fusion
 
 # raw pages (to collect page-level image paths)
 RAW_PAGES = "build/raw_pages.jsonl"
@@ -42,12 +66,46 @@ IMAGES_DIR = "images"  # where extractor wrote page/embedded PNGs
 # local sentence-transformers model
 MODEL_DIR = "models/all-MiniLM-L6-v2"  # local copy recommended
 
+# query-embedding micro-batching: concurrent queries within the window share one forward pass
+EMBED_BATCH_WINDOW_MS = float(os.environ.get("EMBED_BATCH_WINDOW_MS", "3"))
+EMBED_MAX_BATCH = int(os.environ.get("EMBED_MAX_BATCH", "32"))
+
 # Ollama (local LLM)
 OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://127.0.0.1:11434")
 OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3:latest")  # use a model you already have
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")  # keep the model loaded between sparse requests
+OLLAMA_TIMEOUT = float(os.environ.get("OLLAMA_TIMEOUT", "120"))
+OLLAMA_MAX_CONNECTIONS = int(os.environ.get("OLLAMA_MAX_CONNECTIONS", "16"))
+
+# LLM admission control: generations in flight, bounded wait queue, max wait before 503
+LLM_MAX_INFLIGHT = int(os.environ.get("LLM_MAX_INFLIGHT", "2"))
+LLM_MAX_QUEUE = int(os.environ.get("LLM_MAX_QUEUE", "16"))
+LLM_MAX_WAIT_S = float(os.environ.get("LLM_MAX_WAIT_S", "30"))
+
+# semantic answer cache: reuse an answer when the context matches and the query is a near-duplicate
+SEMCACHE_SIZE = int(os.environ.get("SEMCACHE_SIZE", "512"))  # 0 disables
+SEMCACHE_THRESHOLD = float(os.environ.get("SEMCACHE_THRESHOLD", "0.95"))  # min cosine to a cached query
+SEMCACHE_TTL_S = float(os.environ.get("SEMCACHE_TTL_S", "3600"))
+
+# exact-repeat cache of full /ask responses (normalized q, k, deep, k_pages, model)
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", "1024"))  # 0 disables
+ANSWER_CACHE_DB = os.environ.get("ANSWER_CACHE_DB", "")  # e.g. build/answer_cache.db to survive restarts
+
+# files whose rebuild invalidates cached answers (plants.db's build id is stamped too,
+# see index_version; a directory's mtime changes when files are swapped into it)
+INDEX_FILES = [DB, EMB_NPY, MAP_PKL, PAGE_EMB_NPY, PAGE_META_DIR, PAGE_MAP_PKL, PAGE_IVF_NPZ, PAGE_FTS_DB]
 
 # ---------- app ----------
-app = FastAPI(title="PlantDeck RAG", version="0.3")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # resources that live as long as the app (defined further down)
+    await _open_ollama_client()
+    try:
+        yield
+    finally:
+        await _close_ollama_client()
+
+app = FastAPI(title="PlantDeck RAG", version="0.3", lifespan=lifespan)
 
 # Serve static UI if present
 STATIC_DIR = Path("app/static")
@@ -58,24 +116,187 @@ if STATIC_DIR.exists():
 if Path(IMAGES_DIR).exists():
     app.mount("/images", StaticFiles(directory=IMAGES_DIR), name="images")
 
+# ---------- metrics ----------
+class Metrics:
+    """Minimal Prometheus text-format registry: labelled counters and latency histograms."""
+
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}  # (name, labels) -> value
+        self._hists = {}     # (name, labels) -> [per-bucket counts..., sum, count]
+
+    def describe(self, name: str, kind: str, text: str):
+        self._help[name] = (kind, text)
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            h = self._hists.get(key)
+            if h is None:
+                h = self._hists[key] = [0] * len(self.BUCKETS) + [0.0, 0]
+            for i, b in enumerate(self.BUCKETS):
+                if seconds <= b:
+                    h[i] += 1
+            h[-2] += seconds
+            h[-1] += 1
+
+    @staticmethod
+    def _labels(labels, extra=()) -> str:
+        items = list(labels) + list(extra)
+        if not items:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+    def render(self) -> str:
+        lines, seen = [], set()
+        def header(name):
+            if name not in seen and name in self._help:
+                kind, text = self._help[name]
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+            seen.add(name)
+        with self._lock:
+            for (name, labels), v in sorted(self._counters.items()):
+                header(name)
+                lines.append(f"{name}{self._labels(labels)} {v:g}")
+            for (name, labels), h in sorted(self._hists.items()):
+                header(name)
+                for b, c in zip(self.BUCKETS, h):
+                    lines.append(f"{name}_bucket{self._labels(labels, [('le', f'{b:g}')])} {c}")
+                lines.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {h[-1]}")
+                lines.append(f"{name}_sum{self._labels(labels)} {h[-2]:.6f}")
+                lines.append(f"{name}_count{self._labels(labels)} {h[-1]}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+metrics.describe("plantdeck_stage_seconds", "histogram", "Latency of each /ask stage (retrieval stages, queue, call_ollama).")
+metrics.describe("plantdeck_requests_total", "counter", "HTTP requests by endpoint and status.")
+metrics.describe("plantdeck_request_seconds", "histogram", "Time to response start by endpoint.")
+
+_METRIC_PATHS = {"/ask", "/ask/stream", "/health", "/plants", "/metrics"}
+
+@app.middleware("http")
+async def _count_requests(request: Request, call_next):
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    path = request.url.path if request.url.path in _METRIC_PATHS else "other"
+    metrics.inc("plantdeck_requests_total", endpoint=path, status=response.status_code)
+    metrics.observe("plantdeck_request_seconds", time.perf_counter() - t0, endpoint=path)
+    return response
+
+def server_timing(timings: dict) -> str:
+    """Server-Timing header value from {stage: ms}."""
+    return ", ".join(f"{name};dur={ms:.1f}" for name, ms in timings.items())
+
 # ---------- load assets ----------
 required = [DB, EMB_NPY, MAP_PKL]
 missing = [p for p in required if not Path(p).exists()]
 if missing:
-    raise RuntimeError(f"Missing files: {missing}. Run tools/build_sqlite.py and tools/build_index.py first.")
+    raise RuntimeError(f"Missing files: {missing}. Run tools/structure_plants.py and tools/build_index.py first.")
+
+_db_local = threading.local()
+
+def ro_conn(path: str) -> sqlite3.Connection:
+    """Read-only SQLite connection, one per worker thread and reused across requests."""
+    conns = getattr(_db_local, "conns", None)
+    if conns is None:
+        conns = _db_local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        conn = conns[path] = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+    return conn
+
+def db() -> sqlite3.Connection:
+    return ro_conn(DB)
+
+def _has_table(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name=?", (name,)).fetchone() is not None
+
+if not _has_table(db(), "species_doc"):
+    raise RuntimeError(f"{DB} has no species_doc table. Re-run tools/structure_plants.py.")
+species_fts_available = HYBRID and _has_table(db(), "species_fts")
 
 # species embeddings + id map
 emb = np.load(EMB_NPY)
 with open(MAP_PKL, "rb") as f:
     _map = pickle.load(f)  # {"ids": [...], "labels": [...]}
 
+class PageMeta:
+    """Memory-mapped view of build/page_meta; page_map[i] -> {"pdf","page","snippet"}."""
+
+    def __init__(self, d: Path):
+        self.pdf_names = json.loads((d / "pdf_names.json").read_text(encoding="utf-8"))
+        self.pdf_idx = np.load(d / "pdf_idx.npy", mmap_mode="r")
+        self.pages = np.load(d / "pages.npy", mmap_mode="r")
+        self.offsets = np.load(d / "snippet_offsets.npy", mmap_mode="r")
+        self.blob = b""
+        if (d / "snippets.bin").stat().st_size:
+            with open(d / "snippets.bin", "rb") as f:
+                self.blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __getitem__(self, i: int) -> dict:
+        a, b = int(self.offsets[i]), int(self.offsets[i + 1])
+        return {
+            "pdf": self.pdf_names[int(self.pdf_idx[i])],
+            "page": int(self.pages[i]),
+            "snippet": self.blob[a:b].decode("utf-8"),
+        }
+
 # page embeddings (optional)
 page_emb = None
 page_map = None
-if Path(PAGE_EMB_NPY).exists() and Path(PAGE_MAP_PKL).exists():
-    page_emb = np.load(PAGE_EMB_NPY)
-    with open(PAGE_MAP_PKL, "rb") as f:
-        page_map = pickle.load(f)  # list of {"pdf","page","text","snippet"}
+if Path(PAGE_EMB_NPY).exists():
+    if Path(PAGE_META_DIR).is_dir():
+        page_emb = np.load(PAGE_EMB_NPY, mmap_mode="r")
+        page_map = PageMeta(Path(PAGE_META_DIR))
+    elif Path(PAGE_MAP_PKL).exists():
+        page_emb = np.load(PAGE_EMB_NPY)
+        with open(PAGE_MAP_PKL, "rb") as f:
+            page_map = pickle.load(f)  # list of {"pdf","page","text","snippet"}
+
+def _page_fts_matches(conn: sqlite3.Connection) -> bool:
+    """page_fts rowids are page rows: the file must cover exactly the page_map loaded at startup."""
+    row = conn.execute("SELECT rowid FROM page_fts ORDER BY rowid DESC LIMIT 1").fetchone()
+    return (row[0] + 1 if row else 0) == len(page_map)
+
+def page_fts_conn():
+    """
+    This thread's page_fts connection, or None when the file it opened was
+    rebuilt for other page rows (build_page_index.py under a running server;
+    the loaded page_emb/page_map only change on restart). Checked once per
+    connection: an open connection keeps reading the file it opened.
+    """
+    conn = ro_conn(PAGE_FTS_DB)
+    ok = getattr(_db_local, "page_fts_ok", None)
+    if ok is None:
+        ok = _db_local.page_fts_ok = _page_fts_matches(conn)
+    return conn if ok else None
+
+page_fts_available = bool(HYBRID and page_map is not None and Path(PAGE_FTS_DB).exists()
+                          and _has_table(ro_conn(PAGE_FTS_DB), "page_fts"))
+if page_fts_available and page_fts_conn() is None:
+    print(f"[!] {PAGE_FTS_DB} does not match {PAGE_EMB_NPY}; page BM25 disabled")
+    page_fts_available = False
+
+# IVF over page embeddings (optional): centroids + row ids grouped by list
+page_ivf = None
+if page_emb is not None and Path(PAGE_IVF_NPZ).exists():
+    with np.load(PAGE_IVF_NPZ) as z:
+        page_ivf = {"centroids": z["centroids"], "order": z["order"], "offsets": z["offsets"]}
+    if int(page_ivf["offsets"][-1]) != len(page_emb):
+        print(f"[!] {PAGE_IVF_NPZ} does not match {PAGE_EMB_NPY}; using exact page search")
+        page_ivf = None
 
 # build (pdf,page) -> [image file names] map from raw_pages.jsonl
 def _load_page_image_map():
@@ -110,63 +331,97 @@ page_img_map = _load_page_image_map()
 _model = SentenceTransformer(MODEL_DIR if Path(MODEL_DIR).exists()
                              else "sentence-transformers/all-MiniLM-L6-v2")
 
+class EmbedBatcher:
+    """
+    Single background thread in front of the SentenceTransformer. Callers
+    submit one query each; the thread waits up to `window_ms` for more
+    (or until `max_batch`), encodes them in one pass and hands each caller
+    its own row. Torch threads are no longer split across many 1-row encodes.
+    """
+
+    def __init__(self, model, window_ms: float, max_batch: int):
+        self.model = model
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._q = queue.Queue()
+        threading.Thread(target=self._run, name="embed-batcher", daemon=True).start()
+
+    def submit(self, text: str) -> Future:
+        fut = Future()
+        self._q.put((text, fut))
+        return fut
+
+    def _collect(self) -> list:
+        batch = [self._q.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                vecs = self.model.encode([t for t, _ in batch], batch_size=len(batch),
+                                         convert_to_numpy=True, normalize_embeddings=True).astype("float32")
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            for (_, fut), v in zip(batch, vecs):
+                fut.set_result(v)
+
+_batcher = EmbedBatcher(_model, EMBED_BATCH_WINDOW_MS, EMBED_MAX_BATCH)
+
 # ---------- helpers ----------
 def embed(q: str) -> np.ndarray:
-    v = _model.encode([q], convert_to_numpy=True, normalize_embeddings=True).astype("float32")
-    return v[0]
+    return _batcher.submit(q).result()
 
-def topk(q: str, k: int = 5) -> List[Tuple[int, str, float]]:
-    """Species-level nearest neighbors."""
-    v = embed(q)
-    scores = emb @ v  # cosine similarity (rows are normalized)
-    idx = np.argsort(-scores)[:max(1, k)]
-    return [(int(_map["ids"][i]), _map["labels"][i], float(scores[i])) for i in idx]
-
-def fetch_context(sids: List[int]):
-    """Fetch structured species context from SQLite."""
-    if not sids:
-        return []
-    conn = sqlite3.connect(DB); cur = conn.cursor()
+def search(V: np.ndarray, targets) -> list:
+    """
+    Score one or more query vectors V against several indexes in one call.
+    targets: [(matrix (n, d), k, row_ids or None)]. Returns, per target,
+    (ids (m, k), scores (m, k)); ids go through row_ids when the matrix is a
+    gathered subset (e.g. IVF candidates).
+    """
+    V = np.atleast_2d(V)
     out = []
-    for sid in sids:
-        cur.execute("SELECT latin_name,family,id_features,dosage FROM species WHERE id=?", (sid,))
-        s = cur.fetchone()
-        if not s:
+    for mat, k, rows in targets:
+        if len(mat) == 0:
+            out.append((np.empty((len(V), 0), dtype=np.int64), np.empty((len(V), 0), dtype=np.float32)))
             continue
-        cur.execute("SELECT name FROM common_name WHERE species_id=?", (sid,))
-        common = [r[0] for r in cur.fetchall()]
-        cur.execute("SELECT indication,evidence FROM usecase WHERE species_id=?", (sid,))
-        uses = [{"indication": u, "evidence": e} for u, e in cur.fetchall()]
-        cur.execute("SELECT toxicity,contraindications,interactions,notes FROM safety WHERE species_id=?", (sid,))
-        saf = cur.fetchone()
-        cur.execute("SELECT pdf,page FROM citation WHERE species_id=? LIMIT 3", (sid,))
-        cits = [{"pdf": p, "page": pg} for p, pg in cur.fetchall()]
-        out.append({
-            "latin_name": s[0],
-            "common_names": common,
-            "family": s[1],
-            "id_features": s[2],
-            "dosage": s[3],
-            "uses": uses,
-            "safety": {
-                "toxicity": saf[0] if saf else "",
-                "contraindications": saf[1] if saf else "",
-                "interactions": saf[2] if saf else "",
-                "notes": saf[3] if saf else "",
-            },
-            "citations": cits
-        })
-    conn.close()
+        S = V @ mat.T  # cosine similarity (rows are normalized)
+        idx = topk_rows(S, k)
+        out.append((idx if rows is None else rows[idx], np.take_along_axis(S, idx, axis=-1)))
     return out
 
-def page_topk(q: str, k: int = 8) -> List[Tuple[int, float]]:
-    """Page-level nearest neighbors (chunked text)."""
-    if page_emb is None:
+def fetch_context(sids: List[int]):
+    """Fetch structured species context (precomputed species_doc rows) in one query."""
+    if not sids:
         return []
-    v = embed(q)
-    scores = page_emb @ v
-    idx = np.argsort(-scores)[:max(1, k)]
-    return [(int(i), float(scores[i])) for i in idx]
+    marks = ",".join("?" * len(sids))
+    rows = db().execute(f"SELECT species_id,doc FROM species_doc WHERE species_id IN ({marks})", sids).fetchall()
+    docs = {sid: json.loads(doc) for sid, doc in rows}
+    return [docs[sid] for sid in sids if sid in docs]
+
+def ivf_candidates(v: np.ndarray, nprobe: int) -> np.ndarray:
+    """Row ids in the `nprobe` IVF lists whose centroids are closest to v."""
+    c = page_ivf["centroids"] @ v
+    nprobe = min(nprobe, len(c))
+    lists = np.argpartition(-c, nprobe - 1)[:nprobe]
+    order, off = page_ivf["order"], page_ivf["offsets"]
+    return np.concatenate([order[off[l]:off[l + 1]] for l in lists])
+
+def page_target(v: np.ndarray, k: int, nprobe: int = PAGE_NPROBE):
+    """search() target for page chunks: only the IVF-probed rows when an index is present."""
+    if page_ivf is not None and nprobe > 0:
+        rows = ivf_candidates(v, nprobe)
+        return (page_emb[rows], k, rows)
+    return (page_emb, k, None)
 
 def fetch_page_context(idxs: List[Tuple[int, float]]):
     """Return concise page snippets + image URLs for inclusion in the prompt/UI."""
@@ -182,8 +437,180 @@ def fetch_page_context(idxs: List[Tuple[int, float]]):
         out.append({"pdf": pdf, "page": page, "snippet": rec.get("snippet", ""), "images": urls})
     return out
 
-def call_ollama(question: str, species_docs: list, page_docs: list) -> str:
-    """Compose the final answer using Ollama with grounded context."""
+_STOPWORDS = set("""
+a an and are as at be by can do does for from how i in is it its me my of on or should
+that the their there this to use used uses using was what when which who why with you your
+""".split())
+
+def fts_query(q: str, max_terms: int = 24) -> str:
+    """OR of quoted terms, so FTS5 operators in user text can never break the MATCH."""
+    terms = [t for t in re.findall(r"\w+", q.lower()) if len(t) > 1 and t not in _STOPWORDS]
+    return " OR ".join(f'"{t}"' for t in dict.fromkeys(terms[:max_terms]))
+
+def fts_topk(conn: sqlite3.Connection, table: str, q: str, k: int) -> List[int]:
+    """Rowids of the k best BM25 matches (empty when the query has no usable terms)."""
+    match = fts_query(q)
+    if not match:
+        return []
+    rows = conn.execute(
+        f"SELECT rowid FROM {table} WHERE {table} MATCH ? ORDER BY bm25({table}) LIMIT ?", (match, k)
+    ).fetchall()
+    return [r[0] for r in rows]
+
+# exact Latin names -> species id (query n-grams are looked up here before any vector work)
+_label_by_id = {int(i): lab for i, lab in zip(_map["ids"], _map["labels"])}
+_id_by_latin = {lab.lower(): int(i) for i, lab in zip(_map["ids"], _map["labels"])}
+_latin_ngrams = sorted({len(lab.split()) for lab in _id_by_latin}, reverse=True)
+
+_RANK_ABBREVS = {"var.", "subsp.", "ssp.", "f."}
+
+def _name_key(words: List[str]) -> str:
+    """Join an n-gram, dropping a sentence-final period ("... piperita.") but not a rank ("var.")."""
+    last = words[-1]
+    if last.endswith(".") and last not in _RANK_ABBREVS:
+        last = last.rstrip(".")
+    return " ".join(words[:-1] + [last])
+
+def exact_species(q: str) -> List[int]:
+    """Species ids whose Latin name appears verbatim (case-insensitive) in the query."""
+    words = re.findall(r"[a-z][a-z.-]*", q.lower())
+    found = []
+    for n in _latin_ngrams:
+        for i in range(len(words) - n + 1):
+            sid = _id_by_latin.get(_name_key(words[i:i + n]))
+            if sid is not None and sid not in found:
+                found.append(sid)
+    return found
+
+def rrf(rankings, k: int = RRF_K) -> List[Tuple[int, float]]:
+    """Reciprocal-rank fusion: sum of 1/(k + rank) over every ranking an id appears in."""
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda kv: -kv[1])
+
+# ---------- retrieval pipeline ----------
+class Retrieval:
+    """
+    Request-scoped retrieval state. The query is embedded once (`vec`) and each
+    stage reads/writes the fields below; `run` times every stage into `timings`
+    (ms). Rerankers/filters are added by inserting (name, fn) into STAGES.
+    """
+
+    def __init__(self, q: str, k: int = 5, deep: bool = False, k_pages: int = 8):
+        self.q = q
+        self.k = max(1, int(k))  # every stage slices/limits by k; never 0 or negative
+        self.deep = bool(deep and page_emb is not None and page_map is not None)
+        self.k_pages = max(1, int(k_pages))
+        self.vec = None          # query embedding (None when no dense search is needed)
+        self.exact = []          # species ids named verbatim in the query
+        self.lex_species = []    # species ids, BM25 order
+        self.lex_pages = []      # page rows, BM25 order
+        self.dense_species = []  # [(species_id, cosine)]
+        self.dense_pages = []    # [(page row, cosine)]
+        self.hits = []           # [(species_id, latin_name, score)]
+        self.species_ctx = []
+        self.page_hits = []      # [(page row, score)]
+        self.page_ctx = []
+        self.timings = {}        # stage name -> ms
+
+    def run(self, stages=None) -> "Retrieval":
+        for name, stage in (STAGES if stages is None else stages):
+            t0 = time.perf_counter()
+            stage(self)
+            self.timings[name] = (time.perf_counter() - t0) * 1000.0
+            metrics.observe("plantdeck_stage_seconds", self.timings[name] / 1000.0, stage=name)
+        return self
+
+    def time(self, name: str, t0: float):
+        """Record a stage that ran outside run() (queue wait, LLM call) since perf_counter t0."""
+        self.timings[name] = (time.perf_counter() - t0) * 1000.0
+        metrics.observe("plantdeck_stage_seconds", self.timings[name] / 1000.0, stage=name)
+
+    def context_key(self) -> tuple:
+        """What the LLM would see: model + retrieved species and page rows."""
+        return (OLLAMA_MODEL, tuple(sid for sid, _, _ in self.hits), tuple(int(i) for i, _ in self.page_hits))
+
+    def payload(self) -> dict:
+        """Everything /ask returns except the answer."""
+        return {
+            "hits": [{"species_id": sid, "latin_name": name, "score": score} for sid, name, score in self.hits],
+            "context": self.species_ctx,
+            "page_hits": [{"idx": int(i), "score": float(s)} for i, s in self.page_hits],
+            "page_context": self.page_ctx
+        }
+
+def stage_lexical(r: Retrieval):
+    """Exact Latin-name lookup + BM25 over species/pages (sub-millisecond FTS5 queries)."""
+    r.exact = exact_species(r.q)
+    if species_fts_available:
+        r.lex_species = fts_topk(db(), "species_fts", r.q, r.k * FUSE_DEPTH)
+    conn = page_fts_conn() if r.deep and page_fts_available else None
+    if conn is not None:
+        rows = fts_topk(conn, "page_fts", r.q, r.k_pages * FUSE_DEPTH)
+        r.lex_pages = [i for i in rows if 0 <= i < len(page_map)]
+
+def stage_embed(r: Retrieval):
+    # a query that names a species needs no species vector search; pages still do
+    if r.exact and not r.deep:
+        return
+    r.vec = embed(r.q)
+
+def stage_topk(r: Retrieval):
+    """Species and (deep) page search in one fused search() call."""
+    if r.vec is None:
+        return
+    fuse = species_fts_available or page_fts_available
+    targets = []
+    if not r.exact:
+        targets.append((emb, r.k * FUSE_DEPTH if fuse else r.k, None))
+    if r.deep:
+        targets.append(page_target(r.vec, r.k_pages * FUSE_DEPTH if fuse else r.k_pages))
+    res = search(r.vec, targets)
+    if not r.exact:
+        ids, scores = res.pop(0)
+        r.dense_species = [(int(_map["ids"][i]), float(s)) for i, s in zip(ids[0], scores[0])]
+    if r.deep:
+        ids, scores = res.pop(0)
+        r.dense_pages = [(int(i), float(s)) for i, s in zip(ids[0], scores[0])]
+
+def stage_fuse(r: Retrieval):
+    """
+    Reciprocal-rank fusion of exact/BM25/cosine rankings. With a single
+    ranking (no FTS tables, HYBRID=0) the cosine order and scores pass through.
+    """
+    if not r.exact and not r.lex_species:
+        fused = r.dense_species[:r.k]
+    else:
+        fused = rrf([r.exact, r.lex_species, [sid for sid, _ in r.dense_species]])[:r.k]
+    r.hits = [(sid, _label_by_id[sid], score) for sid, score in fused if sid in _label_by_id]
+
+    if r.deep:
+        if r.lex_pages:
+            r.page_hits = rrf([r.lex_pages, [i for i, _ in r.dense_pages]])[:r.k_pages]
+        else:
+            r.page_hits = r.dense_pages[:r.k_pages]
+
+def stage_fetch_context(r: Retrieval):
+    r.species_ctx = fetch_context([sid for sid, _, _ in r.hits])
+
+def stage_fetch_page_context(r: Retrieval):
+    if r.deep:
+        r.page_ctx = fetch_page_context(r.page_hits)
+
+STAGES = [
+    ("lexical", stage_lexical),
+    ("embed", stage_embed),
+    ("topk", stage_topk),
+    ("fuse", stage_fuse),
+    ("fetch_context", stage_fetch_context),
+    ("fetch_page_context", stage_fetch_page_context),
+]
+
+# ---------- LLM ----------
+def build_prompt(question: str, species_docs: list, page_docs: list) -> str:
+    """Grounded prompt shared by the blocking and streaming Ollama calls."""
     system = (
         "You are a cautious herbal field guide. Use ONLY the provided context. "
         "If info is missing, say so clearly. "
@@ -207,13 +634,32 @@ def call_ollama(question: str, species_docs: list, page_docs: list) -> str:
         for s in page_docs:
             ctx += f"- {s['pdf']} p{s['page']}: {s['snippet']}\n"
 
-    prompt = f"{system}\n\nContext:\n{ctx}\n\nQuestion: {question}\n\nAnswer:"
+    return f"{system}\n\nContext:\n{ctx}\n\nQuestion: {question}\n\nAnswer:"
+
+# pooled keep-alive HTTP client for Ollama; opened/closed by the app's lifespan
+_ollama: httpx.AsyncClient = None
+
+async def _open_ollama_client():
+    global _ollama
+    _ollama = httpx.AsyncClient(
+        base_url=OLLAMA_URL,
+        timeout=httpx.Timeout(OLLAMA_TIMEOUT, connect=10.0),
+        limits=httpx.Limits(max_connections=OLLAMA_MAX_CONNECTIONS,
+                            max_keepalive_connections=OLLAMA_MAX_CONNECTIONS),
+    )
+
+async def _close_ollama_client():
+    if _ollama is not None:
+        await _ollama.aclose()
+
+def ollama_payload(prompt: str, stream: bool) -> dict:
+    return {"model": OLLAMA_MODEL, "prompt": prompt, "stream": stream, "keep_alive": OLLAMA_KEEP_ALIVE}
+
+async def call_ollama(question: str, species_docs: list, page_docs: list) -> str:
+    """Compose the final answer using Ollama with grounded context."""
+    prompt = build_prompt(question, species_docs, page_docs)
     try:
-        r = requests.post(
-            f"{OLLAMA_URL}/api/generate",
-            json={"model": OLLAMA_MODEL, "prompt": prompt, "stream": False},
-            timeout=120
-        )
+        r = await _ollama.post("/api/generate", json=ollama_payload(prompt, stream=False))
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Ollama request failed: {e}")
 
@@ -221,6 +667,290 @@ def call_ollama(question: str, species_docs: list, page_docs: list) -> str:
         raise HTTPException(status_code=502, detail=f"Ollama error: {r.text[:300]}")
     return r.json().get("response", "").strip()
 
+async def stream_ollama(question: str, species_docs: list, page_docs: list):
+    """Yield answer tokens as Ollama generates them (NDJSON with "stream": true)."""
+    prompt = build_prompt(question, species_docs, page_docs)
+    try:
+        async with _ollama.stream("POST", "/api/generate", json=ollama_payload(prompt, stream=True)) as r:
+            if r.status_code != 200:
+                text = (await r.aread()).decode("utf-8", errors="ignore")
+                raise HTTPException(status_code=502, detail=f"Ollama error: {text[:300]}")
+            async for line in r.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise HTTPException(status_code=502, detail=f"Ollama error: {chunk['error'][:300]}")
+                tok = chunk.get("response", "")
+                if tok:
+                    yield tok
+                if chunk.get("done"):
+                    break
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Ollama request failed: {e}")
+
+class Admission:
+    """
+    Admission control in front of Ollama. At most `max_inflight` generations
+    run; up to `max_queue` more wait, each for at most `max_wait` seconds.
+    A full queue is rejected at once with 429, a wait that times out with 503;
+    both carry a Retry-After estimated from recent generation times.
+    """
+
+    def __init__(self, max_inflight: int, max_queue: int, max_wait: float):
+        self.max_inflight = max(1, max_inflight)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self._sem = asyncio.Semaphore(self.max_inflight)
+        self.inflight = 0
+        self.waiting = 0
+        self.last_wait_ms = 0.0
+        self.avg_wait_ms = 0.0   # EWMA
+        self.avg_gen_s = 10.0    # EWMA of slot hold time, seeds Retry-After
+        self.rejected = {"queue_full": 0, "timeout": 0}
+
+    def retry_after(self) -> int:
+        est = self.avg_gen_s * (self.waiting + 1) / self.max_inflight
+        return int(min(120, max(1, math.ceil(est))))
+
+    def _reject(self, status: int, reason: str, detail: str):
+        self.rejected[reason] += 1
+        raise HTTPException(status_code=status, detail=detail,
+                            headers={"Retry-After": str(self.retry_after())})
+
+    async def acquire(self) -> "AdmissionSlot":
+        t0 = time.perf_counter()
+        if not self._sem.locked():
+            await self._sem.acquire()  # free slot: returns without suspending
+        else:
+            if self.waiting >= self.max_queue:
+                self._reject(429, "queue_full", "LLM queue is full, try again shortly")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                self._reject(503, "timeout", f"LLM busy: no slot within {self.max_wait:g}s")
+            finally:
+                self.waiting -= 1
+        self.last_wait_ms = (time.perf_counter() - t0) * 1000.0
+        self.avg_wait_ms = 0.8 * self.avg_wait_ms + 0.2 * self.last_wait_ms
+        self.inflight += 1
+        return AdmissionSlot(self)
+
+    def stats(self) -> dict:
+        return {
+            "inflight": self.inflight, "max_inflight": self.max_inflight,
+            "queued": self.waiting, "max_queue": self.max_queue, "max_wait_s": self.max_wait,
+            "last_wait_ms": round(self.last_wait_ms, 1), "avg_wait_ms": round(self.avg_wait_ms, 1),
+            "rejected": dict(self.rejected),
+        }
+
+class AdmissionSlot:
+    """One admitted generation; release() is idempotent so every exit path may call it."""
+
+    def __init__(self, adm: Admission):
+        self.adm = adm
+        self.t0 = time.perf_counter()
+        self.released = False
+
+    def release(self):
+        if self.released:
+            return
+        self.released = True
+        self.adm.inflight -= 1
+        self.adm.avg_gen_s = 0.8 * self.adm.avg_gen_s + 0.2 * (time.perf_counter() - self.t0)
+        self.adm._sem.release()
+
+admission = Admission(LLM_MAX_INFLIGHT, LLM_MAX_QUEUE, LLM_MAX_WAIT_S)
+
+def sse(event: str, data) -> str:
+    """One Server-Sent Events frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# ---------- answer caches ----------
+def index_version() -> str:
+    """
+    Stamp of the index files (path, mtime, size) plus plants.db's build id;
+    any rebuild changes it. build_db commits into the WAL, which leaves
+    plants.db's own mtime and size unchanged, so its PRAGMA user_version
+    (bumped on every build) is what tracks the DB.
+    """
+    h = hashlib.sha1()
+    h.update(f"db-build:{db().execute('PRAGMA user_version').fetchone()[0]};".encode("utf-8"))
+    for p in INDEX_FILES:
+        try:
+            st = os.stat(p)
+            h.update(f"{p}:{st.st_mtime_ns}:{st.st_size};".encode("utf-8"))
+        except FileNotFoundError:
+            h.update(f"{p}:-;".encode("utf-8"))
+    return h.hexdigest()[:12]
+
+class SemanticCache:
+    """
+    Answers keyed on (retrieved context, query vector). A lookup hits when an
+    entry retrieved the same species/page ids, its query vector is within
+    `threshold` cosine of the new one, and it is younger than `ttl`.
+    LRU-bounded; emptied whenever index_version() changes.
+    """
+
+    def __init__(self, size: int, threshold: float, ttl: float):
+        self.size = size
+        self.threshold = threshold
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # id -> (ctx_key, vec, answer, created)
+        self._by_ctx = {}              # ctx_key -> {ids}
+        self._next_id = 0
+        self._version = index_version()
+
+    def _drop(self, eid: int):
+        ctx_key = self._entries.pop(eid)[0]
+        ids = self._by_ctx[ctx_key]
+        ids.discard(eid)
+        if not ids:
+            del self._by_ctx[ctx_key]
+
+    def _check_version(self):
+        v = index_version()
+        if v != self._version:
+            self._entries.clear()
+            self._by_ctx.clear()
+            self._version = v
+
+    def _count(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        metrics.inc("plantdeck_cache_total", cache="semantic", result="hit" if hit else "miss")
+
+    def get(self, ctx_key: tuple, vec) -> str:
+        if self.size <= 0 or vec is None:
+            return None
+        with self._lock:
+            self._check_version()
+            now = time.time()
+            best, best_sim = None, self.threshold
+            for eid in list(self._by_ctx.get(ctx_key, ())):
+                _, v, _, created = self._entries[eid]
+                if now - created > self.ttl:
+                    self._drop(eid)
+                    continue
+                sim = float(v @ vec)
+                if sim >= best_sim:
+                    best, best_sim = eid, sim
+            self._count(best is not None)
+            if best is None:
+                return None
+            self._entries.move_to_end(best)
+            return self._entries[best][2]
+
+    def put(self, ctx_key: tuple, vec, answer: str):
+        if self.size <= 0 or vec is None or not answer:
+            return
+        with self._lock:
+            self._check_version()
+            eid = self._next_id
+            self._next_id += 1
+            self._entries[eid] = (ctx_key, np.array(vec, dtype="float32"), answer, time.time())
+            self._by_ctx.setdefault(ctx_key, set()).add(eid)
+            while len(self._entries) > self.size:
+                self._drop(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0}
+
+class ResponseCache:
+    """
+    Exact-repeat cache of full /ask responses keyed on the normalized request
+    and stamped with index_version(); stale stamps never hit. In-memory LRU,
+    optionally written through to a SQLite side table so it survives restarts.
+    """
+
+    def __init__(self, size: int, path: str = ""):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()  # key -> (version, response)
+        self._conn = None
+        if size > 0 and path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answer_cache(key TEXT PRIMARY KEY, version TEXT, body TEXT, ts REAL)")
+            self._conn.execute("DELETE FROM answer_cache WHERE version != ?", (index_version(),))
+            self._conn.commit()
+
+    @staticmethod
+    def key(body) -> str:
+        q = " ".join(body.q.lower().split())
+        raw = json.dumps([q, body.k, bool(body.deep), body.k_pages if body.deep else 0, OLLAMA_MODEL])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _count(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        metrics.inc("plantdeck_cache_total", cache="exact", result="hit" if hit else "miss")
+
+    def get(self, key: str) -> dict:
+        if self.size <= 0:
+            return None
+        version = index_version()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and entry[0] == version:
+                self._lru.move_to_end(key)
+                self._count(True)
+                return entry[1]
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT body FROM answer_cache WHERE key=? AND version=?", (key, version)).fetchone()
+                if row:
+                    resp = json.loads(row[0])
+                    self._remember(key, version, resp)
+                    self._count(True)
+                    return resp
+            self._count(False)
+            return None
+
+    def _remember(self, key: str, version: str, resp: dict):
+        self._lru[key] = (version, resp)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.size:
+            self._lru.popitem(last=False)
+
+    def put(self, key: str, resp: dict):
+        if self.size <= 0 or not resp.get("answer"):
+            return
+        version = index_version()
+        with self._lock:
+            self._remember(key, version, resp)
+            if self._conn is not None:
+                self._conn.execute("INSERT OR REPLACE INTO answer_cache(key,version,body,ts) VALUES(?,?,?,?)",
+                                   (key, version, json.dumps(resp, ensure_ascii=False), time.time()))
+                self._conn.execute("DELETE FROM answer_cache WHERE key IN "
+                                   "(SELECT key FROM answer_cache ORDER BY ts DESC LIMIT -1 OFFSET ?)",
+                                   (self.size,))
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"entries": len(self._lru), "persistent": self._conn is not None, "hits": self.hits,
+                "misses": self.misses, "hit_rate": round(self.hits / total, 4) if total else 0.0}
+
+semcache = SemanticCache(SEMCACHE_SIZE, SEMCACHE_THRESHOLD, SEMCACHE_TTL_S)
+respcache = ResponseCache(ANSWER_CACHE_SIZE, ANSWER_CACHE_DB)
+metrics.describe("plantdeck_cache_total", "counter", "Answer cache lookups by cache and result.")
+
 # ---------- models ----------
 class AskReq(BaseModel):
     q: str
@@ -235,40 +965,141 @@ def health():
         "ok": True,
         "model": OLLAMA_MODEL,
         "deep_available": bool(page_emb is not None and page_map is not None),
-        "images_available": len(page_img_map) > 0
+        "deep_index": f"ivf(nprobe={PAGE_NPROBE})" if page_ivf is not None and PAGE_NPROBE > 0 else "exact",
+        "hybrid": {"species": species_fts_available, "pages": page_fts_available},
+        "images_available": len(page_img_map) > 0,
+        "llm_queue": admission.stats(),
+        "semantic_cache": semcache.stats(),
+        "response_cache": respcache.stats(),
+        "index_version": index_version()
     }
 
 @app.get("/plants")
 def list_plants(limit: int = 100, offset: int = 0):
-    conn = sqlite3.connect(DB); cur = conn.cursor()
-    cur.execute("SELECT latin_name FROM species ORDER BY latin_name LIMIT ? OFFSET ?", (limit, offset))
-    rows = [r[0] for r in cur.fetchall()]
-    conn.close()
-    return {"plants": rows}
+    cur = db().execute("SELECT latin_name FROM species ORDER BY latin_name LIMIT ? OFFSET ?", (limit, offset))
+    return {"plants": [r[0] for r in cur.fetchall()]}
+
+def retrieve(body: AskReq) -> Retrieval:
+    return Retrieval(body.q, body.k, body.deep, body.k_pages).run()
 
 @app.post("/ask")
-def ask(body: AskReq):
-    # species-level context
-    hits = topk(body.q, body.k)
-    sids = [sid for sid, _, _ in hits]
-    species_ctx = fetch_context(sids)
+async def ask(body: AskReq):
+    key = ResponseCache.key(body)
+    # the answer cache may read/write SQLite: keep it off the event loop too
+    cached = await run_in_threadpool(respcache.get, key)
+    if cached is not None:
+        return JSONResponse({**cached, "cached": "exact"})
 
-    # optional page-level context
-    page_hits = []
-    page_ctx = []
-    if body.deep and page_emb is not None and page_map is not None:
-        page_hits = page_topk(body.q, body.k_pages)
-        page_ctx = fetch_page_context(page_hits)
+    # retrieval is CPU-bound: keep it off the event loop
+    r = await run_in_threadpool(retrieve, body)
+    answer = semcache.get(r.context_key(), r.vec)
+    if answer is not None:
+        resp = {"answer": answer, **r.payload()}
+        await run_in_threadpool(respcache.put, key, resp)
+        return JSONResponse({**resp, "cached": "semantic"}, headers={"Server-Timing": server_timing(r.timings)})
+    t0 = time.perf_counter()
+    slot = await admission.acquire()
+    r.time("queue", t0)
+    t0 = time.perf_counter()
+    try:
+        answer = await call_ollama(body.q, r.species_ctx, r.page_ctx)
+    finally:
+        slot.release()
+    r.time("call_ollama", t0)
+    semcache.put(r.context_key(), r.vec, answer)
+    resp = {"answer": answer, **r.payload()}
+    await run_in_threadpool(respcache.put, key, resp)
+    return JSONResponse(resp, headers={"Server-Timing": server_timing(r.timings)})
 
-    answer = call_ollama(body.q, species_ctx, page_ctx)
+def replay_stream(resp: dict, cached: str, headers: dict = None) -> StreamingResponse:
+    """A cached response in /ask/stream's event format: context, one token, done."""
+    ctx = {k: v for k, v in resp.items() if k != "answer"}
 
-    return {
-        "answer": answer,
-        "hits": [{"species_id": sid, "latin_name": name, "score": score} for sid, name, score in hits],
-        "context": species_ctx,
-        "page_hits": [{"idx": int(i), "score": float(s)} for i, s in page_hits],
-        "page_context": page_ctx
-    }
+    async def events():
+        yield sse("context", ctx)
+        yield sse("token", {"t": resp["answer"]})
+        yield sse("done", {"answer": resp["answer"], "cached": cached})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", **(headers or {})})
+
+@app.post("/ask/stream")
+async def ask_stream(body: AskReq):
+    """
+    Same as /ask, as Server-Sent Events: one `context` event with the retrieval
+    results, then `token` events as Ollama generates, then `done` (or `error`).
+    Server-Timing covers retrieval and queueing (headers go out before generation).
+    """
+    key = ResponseCache.key(body)
+    hit = await run_in_threadpool(respcache.get, key)
+    if hit is not None:
+        return replay_stream(hit, "exact")
+
+    r = await run_in_threadpool(retrieve, body)
+    answer = semcache.get(r.context_key(), r.vec)
+    if answer is not None:
+        resp = {"answer": answer, **r.payload()}
+        await run_in_threadpool(respcache.put, key, resp)
+        return replay_stream(resp, "semantic", headers={"Server-Timing": server_timing(r.timings)})
+
+    # admit before the response starts, so overload still gets a real 429/503
+    t0 = time.perf_counter()
+    slot = await admission.acquire()
+    r.time("queue", t0)
+
+    async def events():
+        t0 = time.perf_counter()
+        try:
+            yield sse("context", r.payload())
+            parts = []
+            try:
+                async for tok in stream_ollama(body.q, r.species_ctx, r.page_ctx):
+                    if not parts:
+                        r.time("first_token", t0)
+                    parts.append(tok)
+                    yield sse("token", {"t": tok})
+            except HTTPException as e:
+                yield sse("error", {"detail": e.detail})
+                return
+            except Exception as e:
+                yield sse("error", {"detail": f"Ollama stream failed: {e}"})
+                return
+            r.time("call_ollama", t0)
+            answer = "".join(parts).strip()
+            semcache.put(r.context_key(), r.vec, answer)
+            await run_in_threadpool(respcache.put, key, {"answer": answer, **r.payload()})
+            yield sse("done", {"answer": answer})
+        finally:
+            slot.release()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Server-Timing": server_timing(r.timings)},
+        background=BackgroundTask(slot.release),  # covers a client that leaves before the body starts
+    )
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus text exposition: stage/request histograms, counters, LLM queue gauges."""
+    q = admission.stats()
+    gauges = [
+        ("plantdeck_llm_inflight", "Ollama generations in flight.", q["inflight"]),
+        ("plantdeck_llm_queue_depth", "Requests waiting for an LLM slot.", q["queued"]),
+        ("plantdeck_llm_queue_wait_ms", "EWMA of LLM queue wait (ms).", q["avg_wait_ms"]),
+    ]
+    text = metrics.render()
+    text += "# HELP plantdeck_cache_hit_ratio Answer cache hits / lookups since start.\n"
+    text += "# TYPE plantdeck_cache_hit_ratio gauge\n"
+    text += f'plantdeck_cache_hit_ratio{{cache="semantic"}} {semcache.stats()["hit_rate"]}\n'
+    text += f'plantdeck_cache_hit_ratio{{cache="exact"}} {respcache.stats()["hit_rate"]}\n'
+    for name, help_text, v in gauges:
+        text += f"# HELP {name} {help_text}\n# TYPE {name} gauge\n{name} {v}\n"
+    text += "# HELP plantdeck_llm_rejected_total Requests rejected by LLM admission control.\n"
+    text += "# TYPE plantdeck_llm_rejected_total counter\n"
+    for reason, n in q["rejected"].items():
+        text += f'plantdeck_llm_rejected_total{{reason="{reason}"}} {n}\n'
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
 
 # ---------- root ----------
 if STATIC_DIR.exists():
@@ -281,7 +1112,7 @@ else:
         return JSONResponse({
             "ok": True,
             "message": "UI not found. Create app/static/index.html to serve a page.",
-            "try": ["/docs", "/health", "/plants", "/ask"]
+            "try": ["/docs", "/health", "/plants", "/ask", "/ask/stream", "/metrics"]
         })
 
 # Quiet the favicon 404 in logs
@@ -0,0 +1,20 @@
+"""
+Top-k selection shared by the server's search() and tools/bench_topk.py.
+Kept free of the server's startup work (models, index files) so the
+benchmark can import it.
+"""
+import numpy as np
+
+def topk_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Column indices of the k best scores in each row, best first. argpartition
+    is O(n); only the k winners get sorted (instead of argsort over all n).
+    """
+    n = scores.shape[-1]
+    k = max(1, min(k, n))
+    if k < n:
+        part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        part = np.broadcast_to(np.arange(n), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(part, order, axis=-1)
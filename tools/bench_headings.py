@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Heading lookup benchmark: find_field per field (the old structure_plants
+loop) vs HeadingScanner.scan, on a synthetic raw_pages.jsonl built from
+tools/headings.yml. Also checks that both give identical fields on every page,
+and that the scanner stays linear on pathological pages (long whitespace
+runs, near-miss heading lines) where find_field goes quadratic.
+
+--pages 0 runs only the pathological check (no synthetic file needed).
+"""
+import sys, json, time, random, argparse
+from pathlib import Path
+from ruamel.yaml import YAML
+from heading_scan import HeadingScanner, find_field
+
+ap = argparse.ArgumentParser(description="heading scanner benchmark")
+ap.add_argument("--pages", type=int, default=100_000, help="Synthetic pages to benchmark (0 = pathological check only)")
+ap.add_argument("--out", default="build/bench_raw_pages.jsonl", help="Synthetic raw_pages.jsonl (reused if present)")
+ap.add_argument("--regen", action="store_true", help="Rebuild the synthetic file even if it exists")
+ap.add_argument("--seed", type=int, default=0)
+ap.add_argument("--patho-chars", type=int, default=1_000_000, help="Size of each pathological page")
+ap.add_argument("--patho-legacy-chars", type=int, default=6_000, help="Size at which find_field is timed on them")
+ap.add_argument("--patho-bound", type=float, default=1.0, help="Max seconds the scanner may take per pathological page")
+args = ap.parse_args()
+
+HEADINGS = YAML().load(open("tools/headings.yml", "r"))["headings"]
+
+WORDS = ("leaf stem root bark flower seed tea tincture infusion decoction bitter aromatic "
+         "astringent tannins alkaloids flavonoids mg daily adults children pregnancy liver "
+         "digestion fever cough wound skin sleep anxiety the and of with for in may be used").split()
+GENERA = ["Achillea", "Mentha", "Salvia", "Urtica", "Plantago", "Taraxacum", "Hypericum", "Calendula"]
+SPECIES = ["millefolium", "piperita", "officinalis", "dioica", "major", "perforatum", "arvensis"]
+
+def sentence(rng, lo=4, hi=14):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(lo, hi)))
+
+def heading(rng, key):
+    key = rng.choice([key, key, key.upper(), key.lower(), key.title()])
+    sep = rng.choice([": ", ":", " - ", " — ", " ", ":\n"])
+    return " " * rng.choice([0, 0, 0, 2]) + key + sep
+
+def body(rng, field):
+    if field == "latin_name":
+        return f"{rng.choice(GENERA)} {rng.choice(SPECIES)}"
+    if rng.random() < 0.3:
+        return "\n".join(f"- {sentence(rng, 1, 4)}" for _ in range(rng.randint(2, 5)))
+    return "\n".join(sentence(rng) for _ in range(rng.randint(1, 4)))
+
+def page(rng):
+    lines = []
+    if rng.random() < 0.2:  # running text, no headings
+        return "\n".join(sentence(rng) for _ in range(rng.randint(5, 40)))
+    for field in rng.sample(list(HEADINGS), rng.randint(1, len(HEADINGS))):
+        if not HEADINGS[field]:
+            continue
+        key = rng.choice(HEADINGS[field])
+        lines.append(heading(rng, key) + body(rng, field))
+        if rng.random() < 0.2:
+            lines.append(f"Note: {sentence(rng)}")  # heading-like line that is no field
+        if rng.random() < 0.1:
+            lines.append(f"{sentence(rng, 2, 5)} {key.lower()} {sentence(rng, 2, 5)}")  # key mid-line
+    if rng.random() < 0.05:
+        lines.append(rng.choice(HEADINGS["family"]))  # bare key at the very end
+    return "\n".join(lines)
+
+def write_synthetic(out: Path):
+    out.parent.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(args.seed)
+    with open(out, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"_meta": {"pdf": "synthetic.pdf", "title": None, "author": None}}) + "\n")
+        for pno in range(1, args.pages + 1):
+            f.write(json.dumps({"pdf": "synthetic.pdf", "page": pno, "text": page(rng), "images": []}) + "\n")
+    print(f"[✓] Wrote {args.pages} synthetic pages to {out}")
+
+def load_texts(path: Path) -> list:
+    texts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            rec = json.loads(line)
+            if "_meta" not in rec:
+                texts.append(rec.get("text", "") or "")
+    return texts
+
+def before(t):
+    return {field: find_field(t, keys) for field, keys in HEADINGS.items()}
+
+def benchmark(scanner: HeadingScanner, texts: list):
+    """find_field vs scanner on every page; prints timings and the first differing page."""
+    t0 = time.perf_counter()
+    old = [before(t) for t in texts]
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new = [scanner.scan(t) for t in texts]
+    t_new = time.perf_counter() - t0
+
+    bad = [i for i, (a, b) in enumerate(zip(old, new)) if a != b]
+    print(f"pages={len(texts)}  fields={len(HEADINGS)}  synonyms={len(scanner.syns)}")
+    print(f"find_field per field : {t_old:8.2f} s  ({t_old / len(texts) * 1e6:7.1f} µs/page)")
+    print(f"HeadingScanner.scan  : {t_new:8.2f} s  ({t_new / len(texts) * 1e6:7.1f} µs/page)  {t_old / max(t_new, 1e-9):5.1f}x")
+    if bad:
+        i = bad[0]
+        diff = {k: (old[i][k], new[i][k]) for k in old[i] if old[i][k] != new[i][k]}
+        print(f"[!] {len(bad)} pages differ; first is page {i + 1}: {diff}")
+    else:
+        print("[✓] identical fields on every page")
+
+# pathological pages: (name, head, repeated unit); the unit is repeated up to the target size
+PATHO = [
+    ("whitespace runs", "Family: x", "\n \t"),
+    ("blank lines", "x", "\n "),
+    ("near-miss headings", "Uses:\n", "\nA" + "b" * 39),
+]
+
+def patho(head, unit, chars):
+    return head + unit * max(1, (chars - len(head)) // len(unit))
+
+def timed(fn, *a):
+    t0 = time.perf_counter()
+    out = fn(*a)
+    return out, time.perf_counter() - t0
+
+def check_pathological(scanner: HeadingScanner) -> list:
+    """Names of the pathological pages where the scanner is over --patho-bound or disagrees with find_field."""
+    print(f"{'pathological page':20}  {'chars':>9}  find_field s  {'chars':>9}  scan s  same")
+    failed = []
+    for name, head, unit in PATHO:
+        small = patho(head, unit, args.patho_legacy_chars)
+        a, t_a = timed(before, small)
+        b, _ = timed(scanner.scan, small)
+        big = patho(head, unit, args.patho_chars)
+        _, t_b = timed(scanner.scan, big)
+        if a != b or t_b > args.patho_bound:
+            failed.append(name)
+        print(f"{name:20}  {len(small):9d}  {t_a:11.3f}  {len(big):9d}  {t_b:6.3f}  {'yes' if a == b else 'NO'}")
+    return failed
+
+def main():
+    scanner = HeadingScanner(HEADINGS)
+    if args.pages > 0:
+        out = Path(args.out)
+        if args.regen or not out.exists():
+            write_synthetic(out)
+        texts = load_texts(out)
+        if texts:
+            benchmark(scanner, texts)
+        else:
+            print(f"[i] {out} has no pages; benchmark skipped")
+        print()
+    failed = check_pathological(scanner)
+    if failed:
+        print(f"[!] scanner over {args.patho_bound}s or fields differ on: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"[✓] scanner under {args.patho_bound}s on every pathological page")
+
+if __name__ == "__main__":
+    main()
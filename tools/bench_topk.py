@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: full argsort vs argpartition + sort of the k winners (the
+server's topk_rows, imported from app/topk.py) on cosine-score vectors of
+10k / 100k / 1M rows.
+"""
+import sys, time, argparse
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.topk import topk_rows
+
+ap = argparse.ArgumentParser(description="top-k selection microbenchmark")
+ap.add_argument("--rows", default="10000,100000,1000000")
+ap.add_argument("--k", type=int, default=8)
+ap.add_argument("--queries", type=int, default=1, help="query vectors scored per call")
+ap.add_argument("--repeat", type=int, default=20)
+args = ap.parse_args()
+
+def by_argsort(S, k):
+    return np.argsort(-S, axis=-1)[..., :k]
+
+def best_ms(fn, *a):
+    best = float("inf")
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        fn(*a)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+rng = np.random.default_rng(0)
+print(f"k={args.k}  queries/call={args.queries}  best of {args.repeat}")
+print(f"{'rows':>9}  argsort ms  topk_rows ms  speedup")
+for n in [int(x) for x in args.rows.split(",") if x.strip()]:
+    S = rng.uniform(-1, 1, size=(args.queries, n)).astype("float32")
+    assert (by_argsort(S, args.k) == topk_rows(S, args.k)).all()
+    a = best_ms(by_argsort, S, args.k)
+    b = best_ms(topk_rows, S, args.k)
+    print(f"{n:9d}  {a:10.3f}  {b:12.3f}  {a / b:6.1f}x")
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import sqlite3, pickle, numpy as np
+import os, sqlite3, pickle, numpy as np
 from pathlib import Path
 from sentence_transformers import SentenceTransformer
 
@@ -33,9 +33,13 @@ def main():
     model = get_model()
     emb = model.encode(corpus, convert_to_numpy=True, normalize_embeddings=True).astype("float32")
     Path("build").mkdir(exist_ok=True)
-    np.save(EMB_NPY, emb)
-    with open(MAP_PKL, "wb") as f:
+    # temp file + swap, so a running server never sees a half-written file
+    with open(EMB_NPY + ".tmp", "wb") as f:
+        np.save(f, emb)
+    with open(MAP_PKL + ".tmp", "wb") as f:
         pickle.dump({"ids": ids, "labels": labels}, f)
+    os.replace(EMB_NPY + ".tmp", EMB_NPY)
+    os.replace(MAP_PKL + ".tmp", MAP_PKL)
     print(f"[✓] Indexed {len(ids)} plants → {EMB_NPY}")
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import json, re, pickle
+import os, json, re, argparse, sqlite3
 from pathlib import Path
 import numpy as np
 from sentence_transformers import SentenceTransformer
@@ -7,7 +7,10 @@ from sentence_transformers import SentenceTransformer
 RAW = Path("build/raw_pages.jsonl")
 MODEL_DIR = "models/all-MiniLM-L6-v2"
 OUT_EMB = Path("build/page_embeddings.npy")
-OUT_MAP = Path("build/page_map.pkl")
+OUT_META = Path("build/page_meta")  # columnar pdf/page/snippet arrays, memory-mapped by the server
+OUT_IVF = Path("build/page_ivf.npz")
+OUT_FTS = Path("build/page_fts.db")  # FTS5 over chunk text, rowid = chunk row
+IVF_MIN_ROWS = 10000  # below this, exact search is already fast
 
 def normalize(s): 
     return re.sub(r"\s+", " ", (s or "")).strip()
@@ -30,7 +33,97 @@ def chunk_text(txt, maxlen=1000, overlap=150):
         if len(chunks) > 5000: break  # safeguard
     return [c for c in chunks if len(c) >= 200]
 
+def save_npy(path: Path, arr):
+    """
+    Write to a temp file and swap it in: the server memory-maps these files,
+    and truncating the inode it has mapped would kill it with SIGBUS.
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+def write_page_meta(records, out_dir: Path):
+    """
+    Columnar, pickle-free chunk metadata: pdf ids + names, page numbers, and
+    snippets as one UTF-8 blob with row offsets (row i = blob[off[i]:off[i+1]]).
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    names = sorted({r["pdf"] for r in records})
+    pdf_ids = {n: i for i, n in enumerate(names)}
+    save_npy(out_dir / "pdf_idx.npy", np.array([pdf_ids[r["pdf"]] for r in records], dtype=np.int32))
+    save_npy(out_dir / "pages.npy", np.array([int(r["page"]) for r in records], dtype=np.int32))
+    offsets = np.zeros(len(records) + 1, dtype=np.int64)
+    tmp = out_dir / "snippets.bin.tmp"
+    with open(tmp, "wb") as f:
+        for i, r in enumerate(records):
+            b = r["snippet"].encode("utf-8")
+            f.write(b)
+            offsets[i + 1] = offsets[i] + len(b)
+    os.replace(tmp, out_dir / "snippets.bin")
+    save_npy(out_dir / "snippet_offsets.npy", offsets)
+    tmp = out_dir / "pdf_names.json.tmp"
+    tmp.write_text(json.dumps(names, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, out_dir / "pdf_names.json")
+
+def write_page_fts(records, path: Path):
+    """
+    BM25-searchable chunk text for hybrid retrieval; rowids match the embedding
+    rows. Built in a temp file and swapped in, like the arrays above: server
+    threads open it lazily and must never see a half-built database.
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    conn = sqlite3.connect(tmp)
+    conn.execute("CREATE VIRTUAL TABLE page_fts USING fts5(text, tokenize='unicode61 remove_diacritics 2')")
+    conn.executemany("INSERT INTO page_fts(rowid, text) VALUES(?,?)", ((i, r["text"]) for i, r in enumerate(records)))
+    conn.execute("INSERT INTO page_fts(page_fts) VALUES('optimize')")
+    conn.commit(); conn.close()
+    os.replace(tmp, path)
+
+def assign_lists(x, centroids, batch=65536):
+    """Nearest centroid (max cosine) per row, in batches to bound memory."""
+    out = np.empty(len(x), dtype=np.int32)
+    for i in range(0, len(x), batch):
+        out[i:i + batch] = np.argmax(x[i:i + batch] @ centroids.T, axis=1)
+    return out
+
+def train_ivf(emb, nlist, iters=20, seed=0):
+    """
+    Spherical k-means over the (normalized) chunk embeddings. Returns the
+    centroids, the row ids grouped by list, and per-list offsets into them:
+    list l holds order[offsets[l]:offsets[l+1]].
+    """
+    rng = np.random.default_rng(seed)
+    n = len(emb)
+    train = emb[np.sort(rng.choice(n, size=min(n, nlist * 64), replace=False))]
+    centroids = train[rng.choice(len(train), size=nlist, replace=False)].copy()
+    for _ in range(iters):
+        assign = assign_lists(train, centroids)
+        counts = np.bincount(assign, minlength=nlist)
+        o = np.argsort(assign, kind="stable")
+        starts = np.cumsum(counts) - counts
+        nz = counts > 0
+        sums = np.zeros_like(centroids)
+        sums[nz] = np.add.reduceat(train[o], starts[nz], axis=0)
+        # reseed empty lists from random training rows
+        if (~nz).any():
+            sums[~nz] = train[rng.choice(len(train), size=int((~nz).sum()), replace=False)]
+        centroids = sums / np.clip(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12, None)
+
+    assign = assign_lists(emb, centroids)
+    order = np.argsort(assign, kind="stable").astype(np.int32)
+    offsets = np.zeros(nlist + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(assign, minlength=nlist))
+    return centroids.astype("float32"), order, offsets
+
 def main():
+    ap = argparse.ArgumentParser(description="Embed page chunks for deep search")
+    ap.add_argument("--nlist", type=int, default=0, help="IVF lists (0 = ~4*sqrt(chunks))")
+    ap.add_argument("--no-ivf", action="store_true", help="Skip the IVF index (exact search only)")
+    args = ap.parse_args()
+
     records = []
     with open(RAW, "r", encoding="utf-8") as f:
         for line in f:
@@ -49,10 +142,23 @@ def main():
     print(f"[+] page-chunks: {len(records)}")
     model = SentenceTransformer(MODEL_DIR)
     emb = model.encode([r["text"] for r in records], convert_to_numpy=True, normalize_embeddings=True).astype("float32")
-    np.save(OUT_EMB, emb)
-    with open(OUT_MAP, "wb") as f:
-        pickle.dump(records, f)
-    print(f"[✓] Saved {OUT_EMB} and {OUT_MAP}")
+    save_npy(OUT_EMB, emb)
+    write_page_meta(records, OUT_META)
+    write_page_fts(records, OUT_FTS)
+    print(f"[✓] Saved {OUT_EMB}, {OUT_META}/ and {OUT_FTS}")
+
+    n = len(emb)
+    if args.no_ivf or n < IVF_MIN_ROWS:
+        if OUT_IVF.exists():
+            OUT_IVF.unlink()  # a stale index would not match the new rows
+        print(f"[i] IVF skipped ({n} chunks); server will use exact search")
+        return
+    nlist = args.nlist or int(4 * np.sqrt(n))
+    nlist = max(1, min(nlist, n // 39))
+    centroids, order, offsets = train_ivf(emb, nlist)
+    np.savez(OUT_IVF, centroids=centroids, order=order, offsets=offsets)
+    sizes = np.diff(offsets)
+    print(f"[✓] Saved {OUT_IVF}: {nlist} lists (rows/list min {sizes.min()}, median {int(np.median(sizes))}, max {sizes.max()})")
 
 if __name__ == "__main__":
     main()
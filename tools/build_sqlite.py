@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
+"""
+Build data/plants.db from plant records: build_db() takes any iterable of
+records (structure_plants.py streams them in directly); run as a script it
+loads the build/plants/*.json export.
+"""
 import json, sqlite3
 from pathlib import Path
 
 PLANTS_DIR = Path("build/plants")
 DB = Path("data/plants.db")
-DB.parent.mkdir(exist_ok=True)
 
 schema = """
 PRAGMA journal_mode=WAL;
@@ -20,43 +24,162 @@ CREATE TABLE IF NOT EXISTS preparation(id INTEGER PRIMARY KEY, species_id INTEGE
 CREATE TABLE IF NOT EXISTS safety(id INTEGER PRIMARY KEY, species_id INTEGER, toxicity TEXT, contraindications TEXT, interactions TEXT, notes TEXT);
 CREATE TABLE IF NOT EXISTS image(id INTEGER PRIMARY KEY, species_id INTEGER, path TEXT, source_pdf TEXT, page INTEGER);
 CREATE TABLE IF NOT EXISTS citation(id INTEGER PRIMARY KEY, species_id INTEGER, pdf TEXT, page INTEGER, snippet TEXT);
+CREATE TABLE IF NOT EXISTS species_doc(species_id INTEGER PRIMARY KEY, doc TEXT);
+CREATE VIRTUAL TABLE IF NOT EXISTS species_fts USING fts5(
+  latin_name, common_names, body, tokenize='unicode61 remove_diacritics 2'
+);
 """
 
-def upsert_species(cur, obj):
-    cur.execute("INSERT OR IGNORE INTO species(latin_name,family,id_features,dosage) VALUES(?,?,?,?)",
-                (obj["latin_name"], obj.get("family"), obj.get("id_features",""), obj.get("dosage","")))
-    cur.execute("SELECT id FROM species WHERE latin_name=?", (obj["latin_name"],))
-    return cur.fetchone()[0]
+def upsert_species(cur, obj, seen: dict = None):
+    """
+    Species id for obj's Latin name. A name already in the DB keeps its id
+    (the server's embeddings.npy maps rows to these ids) and gets obj's
+    fields; within one build (seen: name -> id) the first record's win.
+    """
+    name = obj["latin_name"]
+    if seen is not None and name in seen:
+        return seen[name]
+    cur.execute("INSERT INTO species(latin_name,family,id_features,dosage) VALUES(?,?,?,?) "
+                "ON CONFLICT(latin_name) DO UPDATE SET family=excluded.family, "
+                "id_features=excluded.id_features, dosage=excluded.dosage",
+                (name, obj.get("family"), obj.get("id_features",""), obj.get("dosage","")))
+    cur.execute("SELECT id FROM species WHERE latin_name=?", (name,))
+    sid = cur.fetchone()[0]
+    if seen is not None:
+        seen[name] = sid
+    return sid
+
+def build_species_docs(cur, max_cites=3):
+    """
+    Materialize one denormalized JSON document per species (exactly what the
+    server's fetch_context returns), so a request loads k species in one query.
+    """
+    docs = {}
+    for sid, latin, fam, idf, dosage in cur.execute(
+            "SELECT id,latin_name,family,id_features,dosage FROM species").fetchall():
+        docs[sid] = {
+            "latin_name": latin, "common_names": [], "family": fam, "id_features": idf, "dosage": dosage,
+            "uses": [], "safety": None, "citations": []
+        }
+    for sid, name in cur.execute("SELECT species_id,name FROM common_name ORDER BY id").fetchall():
+        if sid in docs:
+            docs[sid]["common_names"].append(name)
+    for sid, ind, ev in cur.execute("SELECT species_id,indication,evidence FROM usecase ORDER BY id").fetchall():
+        if sid in docs:
+            docs[sid]["uses"].append({"indication": ind, "evidence": ev})
+    for sid, tox, contra, inter, notes in cur.execute(
+            "SELECT species_id,toxicity,contraindications,interactions,notes FROM safety ORDER BY id").fetchall():
+        if sid in docs and docs[sid]["safety"] is None:
+            docs[sid]["safety"] = {"toxicity": tox, "contraindications": contra, "interactions": inter, "notes": notes}
+    for sid, pdf, page in cur.execute("SELECT species_id,pdf,page FROM citation ORDER BY id").fetchall():
+        if sid in docs and len(docs[sid]["citations"]) < max_cites:
+            docs[sid]["citations"].append({"pdf": pdf, "page": page})
+    for d in docs.values():
+        if d["safety"] is None:
+            d["safety"] = {"toxicity": "", "contraindications": "", "interactions": "", "notes": ""}
+
+    cur.execute("DELETE FROM species_doc")
+    cur.executemany("INSERT INTO species_doc(species_id,doc) VALUES(?,?)",
+                    ((sid, json.dumps(d, ensure_ascii=False)) for sid, d in docs.items()))
+    return len(docs)
+
+def build_species_fts(cur):
+    """Full-text index (rowid = species id) over names, constituents and the descriptive fields."""
+    cur.execute("DELETE FROM species_fts")
+    cur.execute("""
+    INSERT INTO species_fts(rowid, latin_name, common_names, body)
+    SELECT s.id, s.latin_name,
+           IFNULL((SELECT GROUP_CONCAT(name, ' ') FROM common_name WHERE species_id=s.id),''),
+           IFNULL(s.family,'') || ' ' || IFNULL(s.id_features,'') || ' ' ||
+           IFNULL((SELECT GROUP_CONCAT(name, ' ') FROM constituent WHERE species_id=s.id),'') || ' ' ||
+           IFNULL((SELECT GROUP_CONCAT(name, ' ') FROM action WHERE species_id=s.id),'') || ' ' ||
+           IFNULL((SELECT GROUP_CONCAT(name, ' ') FROM part_used WHERE species_id=s.id),'') || ' ' ||
+           IFNULL((SELECT GROUP_CONCAT(indication, ' ') FROM usecase WHERE species_id=s.id),'') || ' ' ||
+           IFNULL((SELECT GROUP_CONCAT(text, ' ') FROM preparation WHERE species_id=s.id),'') || ' ' ||
+           IFNULL((SELECT notes FROM safety WHERE species_id=s.id LIMIT 1),'')
+    FROM species s
+    """)
+
+# per-species child rows, cleared and re-inserted on every build (species rows are upserted)
+CHILD_TABLES = ["common_name", "part_used", "constituent", "action", "usecase",
+                "preparation", "safety", "image", "citation", "species_doc"]
+
+def insert_plant(cur, obj, seen: dict = None):
+    sid = upsert_species(cur, obj, seen)
+    for n in obj.get("common_names", []):
+        cur.execute("INSERT INTO common_name(species_id,name) VALUES(?,?)", (sid, n))
+    for n in obj.get("parts_used", []):
+        cur.execute("INSERT INTO part_used(species_id,name) VALUES(?,?)", (sid, n))
+    for n in obj.get("constituents", []):
+        cur.execute("INSERT INTO constituent(species_id,name) VALUES(?,?)", (sid, n))
+    for n in obj.get("actions", []):
+        cur.execute("INSERT INTO action(species_id,name) VALUES(?,?)", (sid, n))
+    for u in obj.get("uses", []):
+        cur.execute("INSERT INTO usecase(species_id,indication,evidence) VALUES(?,?,?)",
+                    (sid, u.get("indication",""), u.get("evidence","")))
+    for p in obj.get("preparations", []):
+        cur.execute("INSERT INTO preparation(species_id,text) VALUES(?,?)", (sid, p.get("text","")))
+    s = obj.get("safety", {})
+    cur.execute("INSERT INTO safety(species_id,toxicity,contraindications,interactions,notes) VALUES(?,?,?,?,?)",
+                (sid, s.get("toxicity",""), s.get("contraindications",""), s.get("interactions",""), s.get("notes","")))
+    for im in obj.get("images", []):
+        cur.execute("INSERT INTO image(species_id,path,source_pdf,page) VALUES(?,?,?,?)",
+                    (sid, im["path"], im["source_pdf"], im["page"]))
+    for c in obj.get("citations", []):
+        cur.execute("INSERT INTO citation(species_id,pdf,page,snippet) VALUES(?,?,?,?)",
+                    (sid, c["pdf"], c["page"], ""))
+
+def build_db(plants, db_path: Path = DB) -> int:
+    """
+    Rebuild db_path from an iterable of plant records in a single transaction:
+    child rows are cleared, species upserted by Latin name (existing names keep
+    their ids) and their rows inserted as records arrive, species no longer
+    present deleted, then species_doc and the FTS index are rebuilt and PRAGMA
+    user_version is bumped as a build id. Readers (the server's WAL
+    connections) see the old contents until the commit. A running server keeps
+    answering with its loaded embeddings: changed species are served with
+    their new documents, removed ones drop out; new species become searchable
+    after tools/build_index.py and a server restart. Returns the number of
+    species documents.
+    """
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        cur = conn.cursor(); cur.executescript(schema)
+        for table in CHILD_TABLES + ["species_fts"]:
+            cur.execute(f"DELETE FROM {table}")
+        seen = {}
+        for obj in plants:
+            insert_plant(cur, obj, seen)
+        kept = set(seen.values())
+        gone = [(sid,) for (sid,) in cur.execute("SELECT id FROM species").fetchall() if sid not in kept]
+        cur.executemany("DELETE FROM species WHERE id=?", gone)
+        n_docs = build_species_docs(cur)
+        build_species_fts(cur)
+        # build id: the WAL commit leaves plants.db's mtime/size alone, so the
+        # server's index_version() reads this to notice the rebuild
+        build = cur.execute("PRAGMA user_version").fetchone()[0] + 1
+        cur.execute(f"PRAGMA user_version = {build}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return n_docs
+
+def load_plant_files(plants_dir: Path = PLANTS_DIR):
+    for jf in sorted(plants_dir.glob("*.json")):
+        yield json.loads(jf.read_text(encoding="utf-8"))
 
 def main():
-    conn = sqlite3.connect(DB); cur = conn.cursor(); cur.executescript(schema)
-    for jf in sorted(PLANTS_DIR.glob("*.json")):
-        obj = json.loads(jf.read_text(encoding="utf-8"))
-        sid = upsert_species(cur, obj)
-        for n in obj.get("common_names", []):
-            cur.execute("INSERT INTO common_name(species_id,name) VALUES(?,?)", (sid, n))
-        for n in obj.get("parts_used", []):
-            cur.execute("INSERT INTO part_used(species_id,name) VALUES(?,?)", (sid, n))
-        for n in obj.get("constituents", []):
-            cur.execute("INSERT INTO constituent(species_id,name) VALUES(?,?)", (sid, n))
-        for n in obj.get("actions", []):
-            cur.execute("INSERT INTO action(species_id,name) VALUES(?,?)", (sid, n))
-        for u in obj.get("uses", []):
-            cur.execute("INSERT INTO usecase(species_id,indication,evidence) VALUES(?,?,?)",
-                        (sid, u.get("indication",""), u.get("evidence","")))
-        for p in obj.get("preparations", []):
-            cur.execute("INSERT INTO preparation(species_id,text) VALUES(?,?)", (sid, p.get("text","")))
-        s = obj.get("safety", {})
-        cur.execute("INSERT INTO safety(species_id,toxicity,contraindications,interactions,notes) VALUES(?,?,?,?,?)",
-                    (sid, s.get("toxicity",""), s.get("contraindications",""), s.get("interactions",""), s.get("notes","")))
-        for im in obj.get("images", []):
-            cur.execute("INSERT INTO image(species_id,path,source_pdf,page) VALUES(?,?,?,?)",
-                        (sid, im["path"], im["source_pdf"], im["page"]))
-        for c in obj.get("citations", []):
-            cur.execute("INSERT INTO citation(species_id,pdf,page,snippet) VALUES(?,?,?,?)",
-                        (sid, c["pdf"], c["page"], ""))
-    conn.commit(); conn.close()
-    print(f"[✓] Built SQLite at {DB}")
+    if not any(PLANTS_DIR.glob("*.json")):
+        # build_db would clear every table and commit an empty database
+        raise SystemExit(f"[!] No plant files in {PLANTS_DIR}/; run tools/structure_plants.py "
+                         f"(it builds {DB} itself; --json exports the files this script reads)")
+    n_docs = build_db(load_plant_files(PLANTS_DIR), DB)
+    print(f"[✓] Built SQLite at {DB} ({n_docs} species documents)")
 
 if __name__ == "__main__":
     main()
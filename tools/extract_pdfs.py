@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
-import os, io, json, subprocess, sys, traceback, hashlib, time
+import os, io, json, subprocess, sys, traceback, hashlib, time, multiprocessing, threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Primary
@@ -11,6 +12,15 @@ import pikepdf
 from pdfminer.high_level import extract_pages
 from pdfminer.layout import LTTextContainer
 
+# Optional: in-process Tesseract, language data loaded once per worker process.
+# `pip install tesserocr` (needs the Tesseract library; prebuilt wheels exist for
+# most platforms). Without it every OCR'd page starts its own tesseract process.
+try:
+    from tesserocr import PyTessBaseAPI, PSM
+    HAS_TESSEROCR = True
+except Exception:
+    HAS_TESSEROCR = False
+
 # Optional fallback (only if available AND POPPLER_PATH set)
 try:
     from pdf2image import convert_from_path
@@ -27,6 +37,9 @@ SRC = Path("pdfs")
 OUT = Path("build")
 IMG_DIR = Path("images")
 LOG = OUT / "extract.log"
+RAW_OUT = OUT / "raw_pages.jsonl"
+PARTIAL = OUT / "raw_pages.jsonl.partial"  # written as pages finish; renamed to RAW_OUT at the end
+MANIFEST = OUT / "extract_manifest.json"  # per-PDF content hash + settings of the pages in RAW_OUT
 OUT.mkdir(exist_ok=True)
 IMG_DIR.mkdir(exist_ok=True)
 
@@ -44,8 +57,25 @@ ap.add_argument("--only", help="Process only PDFs matching substring (case-insen
 ap.add_argument("--dpi", type=int, default=300, help="DPI for page rendering (OCR/page fallback)")
 ap.add_argument("--ocr", action="store_true", help="Force OCR for all pages (render then OCR)")
 ap.add_argument("--no-ocr", action="store_true", help="Disable OCR entirely")
+ap.add_argument("--adaptive-dpi", action="store_true",
+                help="OCR at --min-dpi first; re-render at --dpi only when confidence is below --conf-threshold")
+ap.add_argument("--min-dpi", type=int, default=150, help="First-pass DPI for --adaptive-dpi")
+ap.add_argument("--conf-threshold", type=float, default=80.0,
+                help="Mean word confidence (0-100) a low-DPI pass needs to be kept")
 ap.add_argument("--lang", default="eng", help="Tesseract language (e.g., 'eng', 'eng+spa')")
 ap.add_argument("--max-pages", type=int, default=0, help="Limit pages per PDF (0 = all)")
+ap.add_argument("--ocr-engine", choices=["auto", "cli"], default="auto",
+                help="auto: persistent tesserocr engine per worker if the optional tesserocr package "
+                     "is installed, else one tesseract process per page")
+ap.add_argument("--no-page-images", action="store_true",
+                help="Don't save rendered page PNGs for OCR'd pages (OCR itself runs in memory)")
+ap.add_argument("--workers", type=int, default=1, help="Extract this many PDFs in parallel (process pool)")
+ap.add_argument("--pages-per-task", type=int, default=64,
+                help="With --workers > 1, split longer PDFs into page ranges of this size (0 = whole PDFs)")
+ap.add_argument("--resume", action="store_true",
+                help="Continue an interrupted run: keep PDFs already completed in raw_pages.jsonl.partial")
+ap.add_argument("--full", action="store_true",
+                help="Re-extract every PDF instead of reusing pages of unchanged ones (see extract_manifest.json)")
 args = ap.parse_args()
 
 TESS_EXE = os.environ.get(
@@ -54,9 +84,13 @@ TESS_EXE = os.environ.get(
 )
 POPPLER_PATH = os.environ.get("POPPLER_PATH")  # only needed if we use pdf2image
 
+OCR_ENGINE = "tesserocr" if HAS_TESSEROCR and args.ocr_engine == "auto" else "cli"
+
 def have_tesseract():
     if args.no_ocr:
         return False
+    if OCR_ENGINE == "tesserocr":
+        return True
     try:
         # Don't decode as text (Windows cp1252 will choke) — just drop output.
         subprocess.run([TESS_EXE, "--version"],
@@ -68,6 +102,18 @@ def have_tesseract():
 
 HAS_TESS = have_tesseract()
 FORCE_OCR = args.ocr and HAS_TESS
+ADAPTIVE = args.adaptive_dpi and HAS_TESS and args.min_dpi < args.dpi
+ADAPTIVE_MIN_WORDS = 5  # fewer low-DPI words (blank/near-blank page): confidence says nothing, keep the pass
+
+def ocr_engine_note() -> str:
+    """Which OCR engine this run uses, for the startup message and the log."""
+    if not HAS_TESS:
+        return "OCR off" if args.no_ocr else "OCR off (Tesseract not found)"
+    if OCR_ENGINE == "tesserocr":
+        return "OCR engine: tesserocr (one persistent engine per worker)"
+    if HAS_TESSEROCR:
+        return "OCR engine: tesseract CLI (--ocr-engine cli; one process per page)"
+    return "OCR engine: tesseract CLI, one process per page (pip install tesserocr for a persistent engine)"
 
 def log(msg: str):
     ts = time.strftime("%Y-%m-%d %H:%M:%S")
@@ -77,35 +123,174 @@ def log(msg: str):
 def page_hash(pdf: Path, pno: int) -> str:
     return hashlib.sha1(f"{pdf}:{pno}".encode("utf-8")).hexdigest()[:10]
 
-def ocr_pil_to_text(pil_img: Image.Image, out_png: Path, dpi=300, lang="eng") -> str:
+def pixmap_to_pil(pix) -> Image.Image:
+    """Wrap a rendered pixmap's raw samples (no PNG encode/decode)."""
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    mode = {1: "L", 3: "RGB"}.get(pix.n)
+    if mode is None:
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+        mode = "RGB"
+    return Image.frombytes(mode, (pix.width, pix.height), pix.samples, "raw", mode, pix.stride)
+
+# One engine per language per process; pool workers keep theirs for the whole run.
+_tess_apis = {}
+
+def tess_api(lang: str):
+    """The process's tesserocr engine for `lang`, or None if it can't be initialised."""
+    api = _tess_apis.get(lang)
+    if api is None:
+        try:
+            api = PyTessBaseAPI(lang=lang, psm=PSM.SINGLE_BLOCK)  # same layout mode as the CLI's --psm 6
+        except Exception as e:
+            log(f"[tesserocr-init] lang={lang}: {e}; using the tesseract CLI")
+            api = False
+        _tess_apis[lang] = api
+    return api or None
+
+def ocr_with_api(api, pil_img: Image.Image, dpi: int):
+    api.SetImage(pil_img)
+    api.SetSourceResolution(dpi)
+    return api.GetUTF8Text(), float(api.MeanTextConf())
+
+def ocr_pil_to_text(pil_img: Image.Image, name: str, dpi=300, lang="eng", want_conf=False):
     """
-    Save PIL image with DPI and run Tesseract. Decode stdout as UTF-8 bytes to
-    avoid Windows cp1252 UnicodeDecodeError.
+    OCR an in-memory image; returns (text, info) with info = {"engine", "conf"},
+    or ("", None) without Tesseract. Uses the worker's persistent tesserocr
+    engine when available; conf is the mean word confidence (0-100), which the
+    CLI only reports when want_conf is set.
     """
-    try:
-        pil_img.save(out_png, dpi=(dpi, dpi))
-    except Exception:
-        # last resort: save without DPI
-        pil_img.save(out_png)
-
     if not HAS_TESS:
-        return ""
+        return "", None
+    api = tess_api(lang) if OCR_ENGINE == "tesserocr" else None
+    if api is not None:
+        try:
+            text, conf = ocr_with_api(api, pil_img, dpi)
+            return text, {"engine": "tesserocr", "conf": conf}
+        except Exception as e:
+            log(f"[ocr-exc] {name}: {e}")
+            return "", {"engine": "tesserocr", "conf": None}
+    text, conf = ocr_cli(pil_img, name, dpi, lang, tsv=want_conf)
+    return text, {"engine": "cli", "conf": conf}
+
+def text_from_tsv(tsv: str):
+    """
+    Rebuild plain text and the mean word confidence from Tesseract's TSV
+    output: words joined by spaces, one line per text line, a blank line
+    between paragraphs.
+    """
+    out, confs, cur_line, cur_par = [], [], None, None
+    for row in tsv.splitlines()[1:]:
+        c = row.split("\t")
+        if len(c) < 12 or c[0] != "5":
+            continue  # only word rows (level 5) carry text
+        par, line = tuple(c[1:4]), tuple(c[1:5])
+        if line != cur_line:
+            if cur_line is not None:
+                out.append("\n\n" if par != cur_par else "\n")
+            cur_line, cur_par = line, par
+        else:
+            out.append(" ")
+        out.append(c[11])
+        try:
+            confs.append(float(c[10]))
+        except ValueError:
+            pass
+    if out:
+        out.append("\n")
+    return "".join(out), (sum(confs) / len(confs) if confs else 0.0)
 
-    cmd = [TESS_EXE, str(out_png), "stdout", "--psm", "6", "-l", lang]
+def ocr_cli(pil_img: Image.Image, name: str, dpi=300, lang="eng", tsv=False):
+    """
+    One tesseract process per page: uncompressed PNM bytes are piped to its
+    stdin, so nothing is PNG-encoded or written to disk. Decode stdout as UTF-8
+    bytes to avoid Windows cp1252 UnicodeDecodeError. Returns (text, conf);
+    conf comes from TSV output and is None unless tsv is set.
+    """
+    if pil_img.mode not in ("L", "RGB"):
+        pil_img = pil_img.convert("RGB")
+    buf = io.BytesIO()
+    pil_img.save(buf, format="PPM")
+    cmd = [TESS_EXE, "stdin", "stdout", "--dpi", str(dpi), "--psm", "6", "-l", lang] + (["tsv"] if tsv else [])
     try:
         proc = subprocess.run(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False
+            cmd, input=buf.getvalue(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False
         )
         # Explicit UTF-8 decode; drop undecodable bytes silently
         text = proc.stdout.decode("utf-8", errors="ignore")
         if proc.returncode != 0 and not text.strip():
             # keep stderr short in logs
             err = (proc.stderr or b"")[:200].decode("utf-8", errors="ignore")
-            log(f"[ocr-fail] {out_png.name}: rc={proc.returncode} stderr={err!r}")
-        return text
+            log(f"[ocr-fail] {name}: rc={proc.returncode} stderr={err!r}")
+        return text_from_tsv(text) if tsv else (text, None)
+    except Exception as e:
+        log(f"[ocr-exc] {name}: {e}")
+        return "", None
+
+# Page PNGs are written by background threads while the next page renders/OCRs.
+# At most IMG_PENDING images are held in memory; each process drains its own pool.
+IMG_PENDING = 8
+_img_pool = None
+_img_slots = threading.BoundedSemaphore(IMG_PENDING)
+
+def _write_png(pil_img: Image.Image, path: Path, dpi: int):
+    try:
+        try:
+            pil_img.save(path, dpi=(dpi, dpi))
+        except Exception:
+            # last resort: save without DPI
+            pil_img.save(path)
     except Exception as e:
-        log(f"[ocr-exc] {out_png.name}: {e}")
-        return ""
+        log(f"[img-fail] {path.name}: {e}")
+    finally:
+        _img_slots.release()
+
+def save_page_image(pil_img: Image.Image, name: str, dpi: int):
+    """Queue a rendered page PNG for saving; returns its images entry (None with --no-page-images)."""
+    global _img_pool
+    if args.no_page_images:
+        return None
+    if _img_pool is None:
+        _img_pool = ThreadPoolExecutor(max_workers=2)
+    path = IMG_DIR / f"{name}.png"
+    _img_slots.acquire()
+    _img_pool.submit(_write_png, pil_img, path, dpi)
+    return {"path": str(path), "xref": -1}
+
+def drain_image_saves():
+    """Wait for queued page PNGs (call before a worker returns its records)."""
+    global _img_pool
+    if _img_pool is not None:
+        _img_pool.shutdown(wait=True)
+        _img_pool = None
+
+def ocr_page(render, name: str, imgs_meta: list, adaptive: bool = None):
+    """
+    Render (render(dpi) -> PIL image) and OCR a page, queue its PNG; the image
+    entry goes into imgs_meta. Returns (text, info). With --adaptive-dpi the
+    first pass runs at --min-dpi and the page is re-rendered at --dpi only if
+    it found at least ADAPTIVE_MIN_WORDS words and their confidence is below
+    --conf-threshold. info records the final dpi, its conf, the number of
+    passes and the seconds each pass took.
+    """
+    adaptive = ADAPTIVE if adaptive is None else adaptive
+    dpis = [args.min_dpi, args.dpi] if adaptive else [args.dpi]
+    secs = []
+    for dpi in dpis:
+        t0 = time.perf_counter()
+        pil = render(dpi)
+        text, info = ocr_pil_to_text(pil, name, dpi=dpi, lang=args.lang, want_conf=adaptive)
+        secs.append(round(time.perf_counter() - t0, 3))
+        if info is None or info["conf"] is None or info["conf"] >= args.conf_threshold:
+            break
+        if len(text.split()) < ADAPTIVE_MIN_WORDS:
+            break  # blank pages score conf 0; a second pass would find nothing either
+    entry = save_page_image(pil, name, dpi)
+    if entry:
+        imgs_meta.append(entry)
+    if info is not None:
+        info.update(dpi=dpi, passes=len(secs), secs=secs)
+    return text, info
 
 def is_scanned_page_pymupdf(page) -> bool:
     """Heuristic: very little text OR many embedded images."""
@@ -148,28 +333,31 @@ def save_pixmap_safe(doc, page, xref, name_base: str) -> str:
             log(f"[img-fail] {name_base}: {e} / page-render: {e2}")
             return ""
 
-def extract_with_pymupdf(pdf: Path):
-    """Primary: prefer native text; OCR only for scanned pages or when forced."""
+def range_end(stop, total=None):
+    """Exclusive end page of a task range, honoring --max-pages (None = to the end)."""
+    ends = [x for x in (stop, total, args.max_pages or None) if x is not None]
+    return min(ends) if ends else None
+
+def extract_with_pymupdf(pdf: Path, start: int = 0, stop: int = None):
+    """
+    Primary: prefer native text; OCR only for scanned pages or when forced.
+    Pages [start, stop) only; the meta row belongs to the range starting at 0.
+    """
     doc = fitz.open(pdf)
     try:
-        meta = doc.metadata or {}
-        yield {"_meta": {"pdf": pdf.name, "title": meta.get("title"), "author": meta.get("author")}}
+        if start == 0:
+            meta = doc.metadata or {}
+            yield {"_meta": {"pdf": pdf.name, "title": meta.get("title"), "author": meta.get("author")}}
 
-        total = doc.page_count
-        limit = args.max_pages if args.max_pages and args.max_pages < total else total
-        for pno in range(limit):
+        for pno in range(start, range_end(stop, doc.page_count)):
             page = doc[pno]
             imgs_meta = []
-            text = ""
+            text, ocr = "", None
             try:
                 do_ocr = FORCE_OCR or is_scanned_page_pymupdf(page)
                 if do_ocr:
-                    pix = page.get_pixmap(dpi=args.dpi)
-                    pil = Image.open(io.BytesIO(pix.tobytes("png")))
-                    img_name = f"{pdf.stem}_p{pno+1}_{page_hash(pdf,pno)}"
-                    img_path = IMG_DIR / f"{img_name}.png"
-                    text = ocr_pil_to_text(pil, img_path, dpi=args.dpi, lang=args.lang)
-                    imgs_meta.append({"path": str(img_path), "xref": -1})
+                    render = lambda dpi: pixmap_to_pil(page.get_pixmap(dpi=dpi))
+                    text, ocr = ocr_page(render, f"{pdf.stem}_p{pno+1}_{page_hash(pdf,pno)}", imgs_meta)
                 else:
                     text = page.get_text("text")
                     for i, img in enumerate(page.get_images(full=True)):
@@ -181,69 +369,82 @@ def extract_with_pymupdf(pdf: Path):
                 # last-ditch: render page then (maybe) OCR
                 log(f"[page-fail] {pdf.name} p{pno+1}: {e}")
                 try:
-                    pm = page.get_pixmap(dpi=args.dpi)
-                    pil = Image.open(io.BytesIO(pm.tobytes("png")))
-                    img_name = f"{pdf.stem}_p{pno+1}_{page_hash(pdf,pno)}_fallback"
-                    img_path = IMG_DIR / f"{img_name}.png"
-                    text = ocr_pil_to_text(pil, img_path, dpi=args.dpi, lang=args.lang)
-                    imgs_meta.append({"path": str(img_path), "xref": -1})
+                    render = lambda dpi: pixmap_to_pil(page.get_pixmap(dpi=dpi))
+                    text, ocr = ocr_page(render, f"{pdf.stem}_p{pno+1}_{page_hash(pdf,pno)}_fallback", imgs_meta)
                 except Exception as e2:
                     log(f"[page-render-fail] {pdf.name} p{pno+1}: {e2}")
                     text = ""
 
-            yield {"pdf": pdf.name, "page": pno + 1, "text": text, "images": imgs_meta}
+            rec = {"pdf": pdf.name, "page": pno + 1, "text": text, "images": imgs_meta}
+            if ocr:
+                rec["ocr"] = ocr
+            yield rec
     finally:
         try:
             doc.close()
         except Exception:
             pass
 
-def extract_with_repair_then_pymupdf(pdf: Path):
+def extract_with_repair_then_pymupdf(pdf: Path, start: int = 0, stop: int = None):
     """Try to repair structure with pikepdf, then re-open with PyMuPDF."""
-    fixed = OUT / f"{pdf.stem}__fixed.pdf"
+    fixed = OUT / f"{pdf.stem}__fixed_{start}.pdf"  # per range: workers may repair the same PDF
     with pikepdf.open(pdf) as d:
         d.save(fixed)
-    for rec in extract_with_pymupdf(fixed):
+    for rec in extract_with_pymupdf(fixed, start, stop):
+        # records carry the original file name, not the repaired copy's
+        if "_meta" in rec:
+            rec["_meta"]["pdf"] = pdf.name
+        else:
+            rec["pdf"] = pdf.name
         yield rec
     try:
         fixed.unlink()
     except Exception:
         pass
 
-def extract_with_pdfminer(pdf: Path):
+def extract_with_pdfminer(pdf: Path, start: int = 0, stop: int = None):
     """Last resort text-only extraction."""
     # Emit a simple meta row
-    yield {"_meta": {"pdf": pdf.name, "title": None, "author": None}}
-    pno = 0
-    for page_layout in extract_pages(str(pdf)):
+    if start == 0:
+        yield {"_meta": {"pdf": pdf.name, "title": None, "author": None}}
+    end = range_end(stop)
+    page_numbers = range(start, end) if end is not None else None
+    pno = start
+    for page_layout in extract_pages(str(pdf), page_numbers=page_numbers):
         pno += 1
-        if args.max_pages and pno > args.max_pages:
-            break
         text = ""
         for el in page_layout:
             if isinstance(el, LTTextContainer):
                 text += el.get_text()
         yield {"pdf": pdf.name, "page": pno, "text": text, "images": []}
 
-def extract_with_pdf2image(pdf: Path):
+def extract_with_pdf2image(pdf: Path, start: int = 0, stop: int = None):
     """Optional: render pages via poppler + OCR (if Tesseract)."""
     if not (HAS_PDF2IMG and POPPLER_PATH and HAS_TESS and not args.no_ocr):
         raise RuntimeError("pdf2image path or Tesseract missing")
     # Emit a meta row
-    yield {"_meta": {"pdf": pdf.name, "title": None, "author": None}}
-    pages = convert_from_path(str(pdf), dpi=args.dpi, poppler_path=POPPLER_PATH)
-    for pno, pil in enumerate(pages, start=1):
-        if args.max_pages and pno > args.max_pages:
-            break
-        img_name = f"{pdf.stem}_p{pno}_{page_hash(pdf,pno)}_poppler"
-        img_path = IMG_DIR / f"{img_name}.png"
-        text = ocr_pil_to_text(pil, img_path, dpi=args.dpi, lang=args.lang)
-        yield {"pdf": pdf.name, "page": pno, "text": text, "images": [{"path": str(img_path), "xref": -1}]}
+    if start == 0:
+        yield {"_meta": {"pdf": pdf.name, "title": None, "author": None}}
+    end = range_end(stop)
+    if end is not None and end <= start:
+        return
+    pages = convert_from_path(str(pdf), dpi=args.dpi, poppler_path=POPPLER_PATH,
+                              first_page=start + 1, last_page=end)
+    for pno, pil in enumerate(pages, start=start + 1):
+        imgs_meta = []
+        # poppler renders the whole range up front at --dpi, so no adaptive pass here
+        text, ocr = ocr_page(lambda dpi, pil=pil: pil, f"{pdf.stem}_p{pno}_{page_hash(pdf,pno)}_poppler", imgs_meta,
+                             adaptive=False)
+        rec = {"pdf": pdf.name, "page": pno, "text": text, "images": imgs_meta}
+        if ocr:
+            rec["ocr"] = ocr
+        yield rec
 
-def process_pdf(pdf: Path):
+def process_pdf(pdf: Path, start: int = 0, stop: int = None):
+    """Fallback chain for pages [start, stop) of one PDF (the whole PDF by default)."""
     # Primary
     try:
-        for rec in extract_with_pymupdf(pdf):
+        for rec in extract_with_pymupdf(pdf, start, stop):
             yield rec
         return
     except Exception as e:
@@ -252,7 +453,7 @@ def process_pdf(pdf: Path):
     # Repair + retry
     try:
         log(f"[repair] trying pikepdf on {pdf.name}")
-        for rec in extract_with_repair_then_pymupdf(pdf):
+        for rec in extract_with_repair_then_pymupdf(pdf, start, stop):
             yield rec
         return
     except Exception as e:
@@ -262,7 +463,7 @@ def process_pdf(pdf: Path):
     if HAS_PDF2IMG and POPPLER_PATH and HAS_TESS and not args.no_ocr:
         try:
             log(f"[poppler] using pdf2image on {pdf.name}")
-            for rec in extract_with_pdf2image(pdf):
+            for rec in extract_with_pdf2image(pdf, start, stop):
                 yield rec
             return
         except Exception as e:
@@ -270,28 +471,213 @@ def process_pdf(pdf: Path):
 
     # Last resort text only
     log(f"[pdfminer] falling back to pdfminer for {pdf.name}")
-    for rec in extract_with_pdfminer(pdf):
+    for rec in extract_with_pdfminer(pdf, start, stop):
         yield rec
 
+def page_count(pdf: Path) -> int:
+    try:
+        with fitz.open(pdf) as doc:
+            return doc.page_count
+    except Exception:
+        return 0  # unreadable here: leave it to the fallback chain as one task
+
+def plan_tasks(pdfs):
+    """
+    (pdf, start, stop) tasks in output order. With --workers > 1, PDFs longer
+    than --pages-per-task are split into page ranges so a single huge scan
+    does not leave one worker OCRing for hours while the rest sit idle.
+    """
+    tasks = []
+    step = args.pages_per_task
+    for pdf in pdfs:
+        n = range_end(None, page_count(pdf)) if args.workers > 1 and step > 0 else None
+        if n is None or n <= step:
+            tasks.append((pdf, 0, None))
+        else:
+            tasks.extend((pdf, a, min(a + step, n)) for a in range(0, n, step))
+    return tasks
+
+def extract_range(task) -> list:
+    """Pool task: one page range (each worker opens its own fitz document)."""
+    pdf, start, stop = task
+    recs = list(process_pdf(pdf, start, stop))
+    drain_image_saves()
+    return recs
+
+def iter_task_records(tasks):
+    """
+    Yield (task, records) in task order. With --workers > 1 the tasks run in a
+    process pool; imap re-sequences results, so output is in PDF and page
+    order no matter which range finishes first.
+    """
+    if args.workers <= 1:
+        for task in tasks:
+            print(f"[+] Extracting {task[0].name}")
+            yield task, process_pdf(*task)
+        return
+    with multiprocessing.Pool(processes=args.workers) as pool:
+        for task, recs in zip(tasks, pool.imap(extract_range, tasks)):
+            pdf, start, stop = task
+            print(f"[+] Extracted {pdf.name}" + (f" p{start + 1}-{stop}" if stop else ""))
+            yield task, recs
+
+def done_marker(pdf: Path, pages: int, entry: dict = None) -> dict:
+    """
+    Written after a PDF's last record; readers skip it like any other _meta row.
+    Carries the PDF's manifest entry so a block can be checked for reuse on its own.
+    """
+    return {"_meta": {**(entry or {}), "pdf": pdf.name, "done": True, "pages": pages}}
+
+def completed_prefix(path: Path):
+    """
+    Completion markers in `path` (pdf name -> marker), and the byte offset
+    just past the last one. Anything after it is an unfinished PDF.
+    """
+    done, end, pos = {}, 0, 0
+    with open(path, "rb") as f:
+        for line in f:
+            pos += len(line)
+            if not line.endswith(b"\n"):
+                break  # torn final line
+            if line.startswith(b'{"_meta"'):
+                try:
+                    m = json.loads(line)["_meta"]
+                except Exception:
+                    break
+                if m.get("done"):
+                    done[m["pdf"]] = m
+                    end = pos
+    return done, end
+
+def extraction_settings() -> dict:
+    """Everything besides the PDF bytes that changes the extracted records."""
+    return {"dpi": args.dpi, "lang": args.lang, "ocr": bool(FORCE_OCR), "no_ocr": bool(args.no_ocr),
+            "tesseract": bool(HAS_TESS), "max_pages": args.max_pages,
+            "page_images": not args.no_page_images, "ocr_engine": OCR_ENGINE,
+            "adaptive": [args.min_dpi, args.conf_threshold] if ADAPTIVE else None}
+
+def marker_entry(meta: dict) -> dict:
+    return {k: meta[k] for k in ("sha1", "size", "mtime_ns", "settings", "pages") if k in meta}
+
+def load_manifest() -> dict:
+    try:
+        return json.loads(MANIFEST.read_text(encoding="utf-8")).get("pdfs", {})
+    except Exception:
+        return {}
+
+def save_manifest(entries: dict):
+    tmp = MANIFEST.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps({"version": 1, "pdfs": entries}, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp, MANIFEST)
+
+def file_sha1(pdf: Path, prev: dict = None) -> str:
+    """Content hash; reuses the manifest's hash while size and mtime are unchanged."""
+    st = pdf.stat()
+    if prev and prev.get("size") == st.st_size and prev.get("mtime_ns") == st.st_mtime_ns and prev.get("sha1"):
+        return prev["sha1"]
+    h = hashlib.sha1()
+    with open(pdf, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def manifest_entry(pdf: Path, sha1: str, pages: int) -> dict:
+    st = pdf.stat()
+    return {"sha1": sha1, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "settings": extraction_settings(), "pages": pages}
+
+def index_blocks(path: Path) -> dict:
+    """pdf name -> (start, end, marker) for each complete block (first row through its done marker)."""
+    blocks, cur, start, pos = {}, None, 0, 0
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except Exception:
+                break
+            meta = rec.get("_meta")
+            name = meta.get("pdf") if meta else rec.get("pdf")
+            if name != cur:
+                cur, start = name, pos
+            pos += len(line)
+            if meta and meta.get("done"):
+                blocks[name] = (start, pos, meta)
+    return blocks
+
 def main():
-    # reset log
-    LOG.write_text("", encoding="utf-8")
-    records = []
     pdfs = sorted(SRC.glob("*.pdf"))
     if args.only:
         pdfs = [p for p in pdfs if args.only.lower() in p.name.lower()]
-    for pdf in tqdm(pdfs, desc="Extracting PDFs"):
-        print(f"[+] Extracting {pdf.name}")
-        for rec in process_pdf(pdf):
-            records.append(rec)
-
-    # write output
-    out = OUT / "raw_pages.jsonl"
-    with open(out, "w", encoding="utf-8") as f:
-        for r in records:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
-
-    print(f"[✓] Wrote {out} and extracted images into {IMG_DIR}/")
+
+    old_manifest = load_manifest()
+    manifest = {}
+    mode = "w"
+    if args.resume and PARTIAL.exists():
+        done, end = completed_prefix(PARTIAL)
+        with open(PARTIAL, "r+b") as f:
+            f.truncate(end)  # drop the PDF that was in flight
+        pdfs = [p for p in pdfs if p.name not in set(done)]
+        manifest = {n: marker_entry(m) for n, m in done.items()}
+        mode = "a"
+        print(f"[i] Resuming: {len(done)} PDFs already complete, {len(pdfs)} to go")
+        log(f"[resume] {len(done)} complete PDFs kept")
+    else:
+        # reset log
+        LOG.write_text("", encoding="utf-8")
+    print(f"[i] {ocr_engine_note()}")
+    log(f"[engine] {ocr_engine_note()}")
+
+    # unchanged PDFs (same content hash + settings, complete block in the last output) are copied over
+    hashes = {p.name: file_sha1(p, old_manifest.get(p.name)) for p in pdfs}
+    blocks = index_blocks(RAW_OUT) if RAW_OUT.exists() and not args.full else {}
+    settings = extraction_settings()
+    reuse = {
+        p.name for p in pdfs
+        if p.name in blocks and blocks[p.name][2].get("sha1") == hashes[p.name]
+        and blocks[p.name][2].get("settings") == settings
+    }
+    todo = [p for p in pdfs if p.name not in reuse]
+    print(f"[i] {len(reuse)} unchanged PDFs reused, {len(todo)} to extract")
+
+    # stream records as pages finish; each PDF ends with a completion marker
+    tasks = plan_tasks(todo)
+    ntasks = {}
+    for pdf, _, _ in tasks:
+        ntasks[pdf] = ntasks.get(pdf, 0) + 1
+    results = iter(tqdm(iter_task_records(tasks), total=len(tasks), desc="Extracting PDFs"))
+    with open(PARTIAL, mode, encoding="utf-8", newline="\n") as f:
+        old = open(RAW_OUT, "rb") if reuse else None
+        try:
+            for pdf in pdfs:
+                if pdf.name in reuse:
+                    a, b, meta = blocks[pdf.name]
+                    old.seek(a)
+                    f.write(old.read(b - a).decode("utf-8"))
+                    manifest[pdf.name] = manifest_entry(pdf, hashes[pdf.name], meta.get("pages", 0))
+                else:
+                    pages = 0
+                    for _ in range(ntasks[pdf]):
+                        _, recs = next(results)
+                        for rec in recs:
+                            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                            f.flush()
+                            if "_meta" not in rec:
+                                pages += 1
+                    manifest[pdf.name] = manifest_entry(pdf, hashes[pdf.name], pages)
+                    # serial runs save page PNGs in the background: only mark the PDF
+                    # done once its images are on disk (pool workers already drained)
+                    drain_image_saves()
+                    f.write(json.dumps(done_marker(pdf, pages, manifest[pdf.name]), ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            if old is not None:
+                old.close()
+    drain_image_saves()
+    os.replace(PARTIAL, RAW_OUT)
+    save_manifest(manifest)
+
+    print(f"[✓] Wrote {RAW_OUT} and extracted images into {IMG_DIR}/")
     if not HAS_TESS and not args.no_ocr:
         print("[i] Tesseract not found. OCR skipped (you still have text when available and page PNGs).")
     if HAS_PDF2IMG and not POPPLER_PATH:
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Heading lookup for structure_plants.py.
+
+find_field() is the original per-field lookup: one DOTALL regex search of the
+page per synonym. HeadingScanner finds every synonym of every field in a
+single pass over the page and returns the same (field -> body) results in
+linear time; find_field is quadratic on long whitespace runs (blank OCR areas).
+"""
+import re
+from bisect import bisect_right
+
+def heading_pattern(key: str) -> re.Pattern:
+    # Accept "Key:", "Key -", "Key —", or "Key" on its own; stop at next Heading-like line
+    return re.compile(
+        rf"(?:^|\n)\s*{re.escape(key)}\s*(?::|-)?\s*(.+?)(?=\n[A-Z][^\n]{{0,40}}(?::|-)|\Z)",
+        flags=re.IGNORECASE | re.DOTALL,
+    )
+
+def find_field(text: str, keys) -> str | None:
+    text = text or ""
+    for key in keys:
+        m = heading_pattern(key).search(text)
+        if m:
+            return m.group(1).strip()
+    return None
+
+# Where heading_pattern's lazy body stops: a newline followed by a heading-like line.
+# Same class and flags as its lookahead; each newline is tested once (<= 42 chars).
+BOUNDARY = re.compile(r"\n(?=[A-Z][^\n]{0,40}(?::|-))", re.IGNORECASE)
+_WS = re.compile(r"\s*")
+
+def body_after(text: str, end: int, bounds: list) -> str | None:
+    """
+    heading_pattern's stripped group(1) for a key ending at `end`, without
+    backtracking: skip whitespace, an optional ':' or '-', whitespace again;
+    the body runs to the first boundary after that (or the end of text).
+    bounds are the BOUNDARY positions in text, ascending.
+    """
+    n = len(text)
+    if end >= n:
+        return None  # the regex needs at least one character after the key
+    d = _WS.match(text, end).end()
+    if d < n and text[d] in ":-":
+        d = _WS.match(text, d + 1).end()
+    if d >= n:
+        # only whitespace/separator left: the regex backtracks to match the last character
+        return text[-1].strip()
+    i = bisect_right(bounds, d)
+    return text[d:bounds[i] if i < len(bounds) else n].strip()
+
+class HeadingScanner:
+    """
+    All synonyms of all fields compiled into one alternation that only matches
+    at line starts (after optional horizontal whitespace), longest synonym
+    first. One finditer over the page records where each synonym first
+    occurs; a synonym that is a case-insensitive prefix of the one that
+    matched occurs at the same spot, so it is recorded there too.
+
+    scan() then applies find_field's rules per field: synonyms in headings.yml
+    order, first one present wins, body taken from that occurrence by
+    body_after() against the page's BOUNDARY positions (found once per page).
+    """
+
+    def __init__(self, headings: dict):
+        self.fields = {field: list(keys or []) for field, keys in headings.items()}
+        syns = sorted({k.lower(): k for keys in self.fields.values() for k in keys}.values(),
+                      key=len, reverse=True)
+        self.syns = syns
+        self.index = {s.lower(): i for i, s in enumerate(syns)}
+        # synonyms present wherever synonym i matches (itself included)
+        self.covers = [[j for j, t in enumerate(syns) if s.lower().startswith(t.lower())] for s in syns]
+        alts = "|".join(f"(?P<s{i}>{re.escape(s)})" for i, s in enumerate(syns))
+        # first-character lookahead: lines that can't start a heading fail after one test
+        # instead of trying every alternative at every indentation depth
+        firsts = re.escape("".join(sorted({s[0] for s in syns})))
+        self.rx = re.compile(rf"^[^\S\n]*(?=[{firsts}])(?:{alts})",
+                             re.IGNORECASE | re.MULTILINE) if syns else None
+
+    def occurrences(self, text: str) -> dict:
+        """synonym index -> end of its first occurrence."""
+        first = {}
+        if self.rx is None:
+            return first
+        for m in self.rx.finditer(text):
+            start = m.start(m.lastgroup)
+            for j in self.covers[int(m.lastgroup[1:])]:
+                first.setdefault(j, start + len(self.syns[j]))
+            if len(first) == len(self.syns):
+                break
+        return first
+
+    def scan(self, text: str) -> dict:
+        """field -> body for every field in headings.yml (None where absent), as find_field would."""
+        text = text or ""
+        first = self.occurrences(text)
+        bounds = [m.start() for m in BOUNDARY.finditer(text)] if first else []
+        out = {}
+        for field, keys in self.fields.items():
+            out[field] = None
+            for k in keys:
+                i = self.index[k.lower()]
+                if i in first:
+                    body = body_after(text, first[i], bounds)
+                    if body is not None:
+                        out[field] = body
+                        break
+        return out
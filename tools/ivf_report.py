@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Recall vs latency of the IVF page index (build/page_ivf.npz) against exact search.
+Queries are chunk embeddings with a little noise, so the exact neighbours are
+not trivially the query row itself.
+"""
+import time, argparse
+from pathlib import Path
+import numpy as np
+
+EMB = Path("build/page_embeddings.npy")
+IVF = Path("build/page_ivf.npz")
+
+ap = argparse.ArgumentParser(description="IVF recall/latency report")
+ap.add_argument("--queries", type=int, default=200)
+ap.add_argument("--k", type=int, default=8)
+ap.add_argument("--nprobe", default="1,2,4,8,16,32,64", help="Comma-separated nprobe values")
+ap.add_argument("--noise", type=float, default=0.05)
+args = ap.parse_args()
+
+emb = np.load(EMB)
+with np.load(IVF) as z:
+    centroids, order, offsets = z["centroids"], z["order"], z["offsets"]
+
+rng = np.random.default_rng(0)
+Q = emb[rng.choice(len(emb), size=min(args.queries, len(emb)), replace=False)]
+Q = Q + rng.normal(scale=args.noise, size=Q.shape).astype("float32")
+Q /= np.linalg.norm(Q, axis=1, keepdims=True)
+
+def exact(v):
+    scores = emb @ v
+    return np.argsort(-scores)[:args.k]
+
+def ivf(v, nprobe):
+    c = centroids @ v
+    lists = np.argpartition(-c, nprobe - 1)[:nprobe]
+    rows = np.concatenate([order[offsets[l]:offsets[l + 1]] for l in lists])
+    scores = emb[rows] @ v
+    return rows[np.argsort(-scores)[:args.k]]
+
+def timed(fn, *a):
+    t0 = time.perf_counter()
+    out = fn(*a)
+    return out, (time.perf_counter() - t0) * 1000
+
+truth, t_exact = [], []
+for v in Q:
+    ids, ms = timed(exact, v)
+    truth.append(set(ids.tolist())); t_exact.append(ms)
+
+print(f"rows={len(emb)}  lists={len(centroids)}  queries={len(Q)}  k={args.k}")
+print(f"{'search':14}  recall@k   mean ms    p95 ms  max rows")
+print(f"{'exact':14}     1.000  {np.mean(t_exact):8.3f}  {np.percentile(t_exact, 95):8.3f}  {len(emb):8d}")
+for nprobe in [int(x) for x in args.nprobe.split(",") if x.strip()]:
+    nprobe = min(nprobe, len(centroids))
+    rec, ms_all = [], []
+    for v, t in zip(Q, truth):
+        ids, ms = timed(ivf, v, nprobe)
+        rec.append(len(t & set(ids.tolist())) / len(t)); ms_all.append(ms)
+    scanned = np.diff(offsets)[np.argsort(-np.diff(offsets))][:nprobe].sum()  # largest lists
+    print(f"{'ivf/' + str(nprobe):14}     {np.mean(rec):.3f}  {np.mean(ms_all):8.3f}  {np.percentile(ms_all, 95):8.3f}  {scanned:8d}")
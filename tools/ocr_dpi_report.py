@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Adaptive-DPI OCR report from build/raw_pages.jsonl (extract_pdfs.py --adaptive-dpi):
+pages kept at the low DPI vs re-rendered, OCR time spent vs an estimate for
+OCRing every page at the full DPI, and the confidence distribution per PDF.
+
+A page kept at the low DPI would have cost one full-DPI pass; that cost is
+the median second-pass time of the same PDF (all PDFs at the same DPI if it
+has none, else the low pass scaled by the pixel ratio). Each PDF's DPIs and
+threshold come from the settings in its done marker.
+"""
+import json, argparse, collections, statistics
+from pathlib import Path
+
+RAW = Path("build/raw_pages.jsonl")
+BINS = list(range(0, 100, 10))  # confidence histogram: [0,10) ... [90,100]
+
+ap = argparse.ArgumentParser(description="Adaptive-DPI OCR report")
+ap.add_argument("--dpi", type=int, default=300,
+                help="Full DPI for PDFs whose done marker records no settings (outputs of older runs)")
+args = ap.parse_args()
+
+pages = collections.defaultdict(list)
+settings = {}  # pdf -> extraction settings from its done marker
+with open(RAW, "r", encoding="utf-8") as f:
+    for line in f:
+        rec = json.loads(line)
+        meta = rec.get("_meta")
+        if meta:
+            if meta.get("done") and meta.get("settings"):
+                settings[meta["pdf"]] = meta["settings"]
+            continue
+        if rec.get("ocr"):
+            pages[rec["pdf"]].append(rec["ocr"])
+
+missing = [pdf for pdf in pages if pdf not in settings]
+if missing:
+    print(f"[!] no recorded settings for {len(missing)} PDFs; assuming --dpi {args.dpi} for them")
+
+def full_dpi(pdf):
+    return settings.get(pdf, {}).get("dpi") or args.dpi
+
+def dpi_label(pdf):
+    s = settings.get(pdf)
+    if s is None:
+        return f"?/{args.dpi}"
+    if s.get("adaptive"):
+        lo, thr = s["adaptive"]
+        return f"{lo}/{s['dpi']}@{thr:g}"
+    return f"{s['dpi']}"
+
+high_by_dpi = collections.defaultdict(list)  # full dpi -> second-pass secs over all PDFs
+for pdf, ps in pages.items():
+    high_by_dpi[full_dpi(pdf)] += [o["secs"][-1] for o in ps if o.get("passes", 1) > 1]
+
+def full_pass_secs(pdf, ps, o):
+    dpi = full_dpi(pdf)
+    high = [p["secs"][-1] for p in ps if p.get("passes", 1) > 1] or high_by_dpi[dpi]
+    if high:
+        return statistics.median(high)
+    return o["secs"][0] * (dpi / max(o.get("dpi") or dpi, 1)) ** 2
+
+def histogram(confs):
+    counts = [0] * len(BINS)
+    for c in confs:
+        counts[min(int(c) // 10, len(BINS) - 1)] += 1
+    return " ".join(f"{n:4d}" for n in counts)
+
+print(f"{'PDF':42}  {'dpi':>12}  ocr  low  re-rend  mean conf  spent s  full-dpi s  saved")
+tot_spent = tot_full = 0.0
+for pdf, ps in pages.items():
+    dpi = full_dpi(pdf)
+    spent = sum(sum(o.get("secs") or [0]) for o in ps)
+    full = 0.0
+    for o in ps:
+        secs = o.get("secs") or [0]
+        full += secs[-1] if o.get("passes", 1) > 1 else (full_pass_secs(pdf, ps, o) if o.get("dpi", dpi) < dpi else secs[0])
+    rerendered = sum(1 for o in ps if o.get("passes", 1) > 1)
+    low = sum(1 for o in ps if o.get("passes", 1) == 1 and o.get("dpi", dpi) < dpi)
+    confs = [o["conf"] for o in ps if o.get("conf") is not None]
+    mean = statistics.mean(confs) if confs else float("nan")
+    saved = (1 - spent / full) * 100 if full else 0
+    tot_spent += spent; tot_full += full
+    print(f"{pdf[:42]:42}  {dpi_label(pdf):>12}  {len(ps):3d}  {low:3d}  {rerendered:7d}  {mean:9.1f}  {spent:7.1f}  {full:10.1f}  {saved:5.1f}%")
+
+if tot_full:
+    print(f"{'TOTAL':42}  {'':12}  {'':3}  {'':3}  {'':7}  {'':9}  {tot_spent:7.1f}  {tot_full:10.1f}  {(1 - tot_spent / tot_full) * 100:5.1f}%")
+
+print()
+print(f"{'confidence histogram':42}  " + " ".join(f"{b:>4}" for b in BINS))
+for pdf, ps in pages.items():
+    print(f"{pdf[:42]:42}  " + histogram(o["conf"] for o in ps if o.get("conf") is not None))
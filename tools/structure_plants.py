@@ -1,12 +1,36 @@
 #!/usr/bin/env python3
-import json, re, hashlib
+"""
+Structure build/raw_pages.jsonl into one record per plant and load them into
+data/plants.db (build_sqlite.build_db, one transaction); --json also writes
+build/plants/*.json for debugging or a standalone build_sqlite.py run.
+
+Pages attach to the last Latin name seen, across PDF boundaries too. The input
+is sharded by PDF; each shard is parsed on its own (optionally in a process
+pool) and reports the pages before its first Latin name separately, so the
+merge can hand them to the name carried over from earlier shards.
+
+Parsed shards are cached by content (build/structure_cache/), so a rerun only
+parses PDFs whose raw pages changed, and only plant files whose content
+changed are rewritten.
+"""
+import os, json, re, hashlib, mmap, pickle, argparse, multiprocessing
 from pathlib import Path
 from ruamel.yaml import YAML
+import heading_scan
+from heading_scan import HeadingScanner
+from build_sqlite import build_db, DB
+
+try:
+    from tqdm.auto import tqdm
+except Exception:
+    def tqdm(it, **kwargs): return it  # no-op if tqdm not installed
 
 yaml = YAML()
 CFG = yaml.load(open("tools/headings.yml", "r"))
 RAW = Path("build/raw_pages.jsonl")
-OUTDIR = Path("build/plants"); OUTDIR.mkdir(parents=True, exist_ok=True)
+OUTDIR = Path("build/plants")
+CACHE_DIR = Path("build/structure_cache")  # parsed shards, keyed by shard bytes + parser fingerprint
+scanner = HeadingScanner(CFG["headings"])
 
 # ---------- helpers ----------
 def normalize_spaces(s: str) -> str:
@@ -15,21 +39,6 @@ def normalize_spaces(s: str) -> str:
     s = re.sub(r"[ \t]+", " ", s)
     return s.strip()
 
-def heading_pattern(key: str) -> re.Pattern:
-    # Accept "Key:", "Key -", "Key —", or "Key" on its own; stop at next Heading-like line
-    return re.compile(
-        rf"(?:^|\n)\s*{re.escape(key)}\s*(?::|-)?\s*(.+?)(?=\n[A-Z][^\n]{{0,40}}(?::|-)|\Z)",
-        flags=re.IGNORECASE | re.DOTALL,
-    )
-
-def find_field(text: str, keys) -> str | None:
-    text = text or ""
-    for key in keys:
-        m = heading_pattern(key).search(text)
-        if m:
-            return m.group(1).strip()
-    return None
-
 def extract_binomial(s: str) -> str | None:
     """Find a plausible Latin binomial (optionally with infraspecific rank)."""
     if not s: return None
@@ -74,12 +83,79 @@ def safe_slug(name: str, maxlen: int = 80) -> str:
     h = hashlib.sha1(slug.encode("utf-8")).hexdigest()[:8]
     return f"{slug[:maxlen-9]}_{h}"
 
-# ---------- main ----------
-plants: dict[str, dict] = {}
-last_key = None
+# ---------- parsing ----------
+def new_plant(latin: str) -> dict:
+    return {
+        "latin_name": latin, "common_names": [], "family": None,
+        "id_features": "", "parts_used": [], "constituents": [],
+        "actions": [], "uses": [], "preparations": [], "dosage": "",
+        "safety": {"notes": "", "toxicity": "", "contraindications": "", "interactions": ""},
+        "lookalikes": [], "images": [], "citations": [], "sources": []
+    }
+
+def apply_page(cur: dict, fields: dict, page: dict):
+    """Add one page's fields (scanner output) and images/citation (page info) to a plant."""
+    cmn   = fields["common_names"]
+    fam   = fields["family"]
+    ida   = fields["id_features"]
+    parts = fields["parts_used"]
+    cons  = fields["constituents"]
+    act   = fields["actions"]
+    uses  = fields["uses"]
+    prep  = fields["preparations"]
+    dose  = fields["dosage"]
+    safe  = fields["safety"]
+    look  = fields["lookalikes"]
+    syns  = fields.get("synonyms")
+
+    if cmn:   cur["common_names"] += split_list(cmn)
+    if fam and not cur["family"]: cur["family"] = normalize_spaces(fam)
+    if ida:
+        cur["id_features"] += ("\n" if cur["id_features"] else "") + ida.strip()
+    if parts: cur["parts_used"]   += split_list(parts)
+    if cons:  cur["constituents"] += split_list(cons)
+    if act:   cur["actions"]      += split_list(act)
+    if uses:
+        for u in split_list(uses):
+            cur["uses"].append({"indication": u, "evidence": "unspecified"})
+    if prep:
+        for p in split_list(prep):
+            cur["preparations"].append({"text": p})
+    if dose and not cur["dosage"]:
+        cur["dosage"] = normalize_spaces(dose)
+    if look:  cur["lookalikes"]   += split_list(look)
+    if syns:  cur["common_names"] += split_list(syns)
+
+    if safe:
+        s = safe.lower()
+        if "toxic" in s and not cur["safety"]["toxicity"]:
+            cur["safety"]["toxicity"] = "possible/mentioned"
+        if "contra" in s and not cur["safety"]["contraindications"]:
+            cur["safety"]["contraindications"] = safe
+        if "interact" in s and not cur["safety"]["interactions"]:
+            cur["safety"]["interactions"] = safe
+        cur["safety"]["notes"] += ("\n" if cur["safety"]["notes"] else "") + safe
 
-with open(RAW, "r", encoding="utf-8") as f:
-    for line in f:
+    # images & citations
+    for im in page["images"]:
+        path = im.get("path")
+        if path:
+            cur["images"].append({"path": path, "source_pdf": page["pdf"], "page": page["page"]})
+    if page["cited"]:
+        cur["citations"].append({"pdf": page["pdf"], "page": page["page"]})
+    # provenance: every PDF that contributed a page
+    if not cur["sources"] or cur["sources"][-1] != page["pdf"]:
+        cur["sources"].append(page["pdf"])
+
+def parse_lines(lines):
+    """
+    Parse one shard of raw_pages.jsonl lines. Returns (head, plants, tail_key):
+    head = [(fields, page)] for pages before the shard's first Latin name (they
+    belong to whatever name was current before the shard), plants = records
+    started in this shard, tail_key = name current at its end (None if it has none).
+    """
+    head, plants, last_key = [], {}, None
+    for line in lines:
         rec = json.loads(line)
 
         # Skip extractor meta rows
@@ -87,102 +163,215 @@ with open(RAW, "r", encoding="utf-8") as f:
             continue
 
         t = rec.get("text", "") or ""
-        images = rec.get("images", []) or []
+        page = {"pdf": rec["pdf"], "page": rec["page"], "images": rec.get("images", []) or [],
+                "cited": bool(t.strip())}
 
-        raw_latin = find_field(t, CFG["headings"]["latin_name"])
+        # every heading on the page in one pass (field -> body, as find_field returned)
+        fields = scanner.scan(t)
+        raw_latin = fields["latin_name"]
         if raw_latin:
             latin = extract_binomial(raw_latin)  # << normalize to Genus species
             if latin:
-                plants.setdefault(latin, {
-                    "latin_name": latin, "common_names": [], "family": None,
-                    "id_features": "", "parts_used": [], "constituents": [],
-                    "actions": [], "uses": [], "preparations": [], "dosage": "",
-                    "safety": {"notes": "", "toxicity": "", "contraindications": "", "interactions": ""},
-                    "lookalikes": [], "images": [], "citations": []
-                })
+                plants.setdefault(latin, new_plant(latin))
                 last_key = latin
             # If no valid binomial found, we DO NOT switch last_key (prevents table rows from hijacking)
 
-        if not plants or not last_key:
+        if last_key is None:
+            head.append((fields, page))
             continue
-        cur = plants[last_key]
-
-        cmn   = find_field(t, CFG["headings"]["common_names"])
-        fam   = find_field(t, CFG["headings"]["family"])
-        ida   = find_field(t, CFG["headings"]["id_features"])
-        parts = find_field(t, CFG["headings"]["parts_used"])
-        cons  = find_field(t, CFG["headings"]["constituents"])
-        act   = find_field(t, CFG["headings"]["actions"])
-        uses  = find_field(t, CFG["headings"]["uses"])
-        prep  = find_field(t, CFG["headings"]["preparations"])
-        dose  = find_field(t, CFG["headings"]["dosage"])
-        safe  = find_field(t, CFG["headings"]["safety"])
-        look  = find_field(t, CFG["headings"]["lookalikes"])
-        syns  = find_field(t, CFG["headings"].get("synonyms", [])) if "synonyms" in CFG["headings"] else None
-
-        if cmn:   cur["common_names"] += split_list(cmn)
-        if fam and not cur["family"]: cur["family"] = normalize_spaces(fam)
-        if ida:
-            cur["id_features"] += ("\n" if cur["id_features"] else "") + ida.strip()
-        if parts: cur["parts_used"]   += split_list(parts)
-        if cons:  cur["constituents"] += split_list(cons)
-        if act:   cur["actions"]      += split_list(act)
-        if uses:
-            for u in split_list(uses):
-                cur["uses"].append({"indication": u, "evidence": "unspecified"})
-        if prep:
-            for p in split_list(prep):
-                cur["preparations"].append({"text": p})
-        if dose and not cur["dosage"]:
-            cur["dosage"] = normalize_spaces(dose)
-        if look:  cur["lookalikes"]   += split_list(look)
-        if syns:  cur["common_names"] += split_list(syns)
-
-        if safe:
-            s = safe.lower()
-            if "toxic" in s and not cur["safety"]["toxicity"]:
-                cur["safety"]["toxicity"] = "possible/mentioned"
-            if "contra" in s and not cur["safety"]["contraindications"]:
-                cur["safety"]["contraindications"] = safe
-            if "interact" in s and not cur["safety"]["interactions"]:
-                cur["safety"]["interactions"] = safe
-            cur["safety"]["notes"] += ("\n" if cur["safety"]["notes"] else "") + safe
-
-        # images & citations
-        for im in images:
-            path = im.get("path")
-            if path:
-                cur["images"].append({"path": path, "source_pdf": rec["pdf"], "page": rec["page"]})
-        if t.strip():
-            cur["citations"].append({"pdf": rec["pdf"], "page": rec["page"]})
-
-# de-dupe lists and tidy
-for p in plants.values():
-    p["common_names"] = dedupe_keep_order([x for x in map(normalize_spaces, p["common_names"]) if x])
-    p["parts_used"]   = dedupe_keep_order(p["parts_used"])
-    p["constituents"] = dedupe_keep_order(p["constituents"])
-    p["actions"]      = dedupe_keep_order(p["actions"])
-    p["lookalikes"]   = dedupe_keep_order(p["lookalikes"])
-
-    # de-dupe images (by path) and citations (by pdf+page)
-    seen_paths = set(); imgs = []
-    for im in p["images"]:
-        if im["path"] not in seen_paths:
-            imgs.append(im); seen_paths.add(im["path"])
-    p["images"] = imgs
-
-    seen_cite = set(); cites = []
-    for c in p["citations"]:
-        key = (c["pdf"], c["page"])
-        if key not in seen_cite:
-            cites.append(c); seen_cite.add(key)
-    p["citations"] = cites
-
-# write files (short, safe filenames)
-for latin, obj in plants.items():
-    fn = safe_slug(latin, maxlen=80)
-    Path("build/plants").joinpath(f"{fn}.json").write_text(
-        json.dumps(obj, ensure_ascii=False, indent=2), encoding="utf-8"
-    )
-
-print(f"[✓] Wrote {len(plants)} plant JSON files to build/plants/")
+        apply_page(plants[last_key], fields, page)
+    return head, plants, last_key
+
+def join_text(a: str, b: str) -> str:
+    return a + ("\n" if a and b else "") + b
+
+def merge_plant(cur: dict, new: dict):
+    """Append a later shard's record for the same plant, as if its pages had followed."""
+    for k in ("common_names", "parts_used", "constituents", "actions", "uses", "preparations",
+              "lookalikes", "images", "citations", "sources"):
+        cur[k] += new[k]
+    if not cur["family"]: cur["family"] = new["family"]
+    if not cur["dosage"]: cur["dosage"] = new["dosage"]
+    cur["id_features"] = join_text(cur["id_features"], new["id_features"])
+    for k in ("toxicity", "contraindications", "interactions"):
+        if not cur["safety"][k]: cur["safety"][k] = new["safety"][k]
+    cur["safety"]["notes"] = join_text(cur["safety"]["notes"], new["safety"]["notes"])
+
+def merge_shards(results) -> dict:
+    """Fold (head, plants, tail_key) shard results, in input order, into one plant dict."""
+    plants: dict[str, dict] = {}
+    last_key = None
+    for head, shard_plants, tail_key in results:
+        if last_key is not None:
+            for fields, page in head:
+                apply_page(plants[last_key], fields, page)
+        for latin, p in shard_plants.items():
+            if latin in plants:
+                merge_plant(plants[latin], p)
+            else:
+                plants[latin] = p
+        if tail_key is not None:
+            last_key = tail_key
+    return plants
+
+def tidy(plants: dict):
+    """De-dupe lists and tidy, in place."""
+    for p in plants.values():
+        p["common_names"] = dedupe_keep_order([x for x in map(normalize_spaces, p["common_names"]) if x])
+        p["parts_used"]   = dedupe_keep_order(p["parts_used"])
+        p["constituents"] = dedupe_keep_order(p["constituents"])
+        p["actions"]      = dedupe_keep_order(p["actions"])
+        p["lookalikes"]   = dedupe_keep_order(p["lookalikes"])
+        p["sources"]      = dedupe_keep_order(p["sources"])
+
+        # de-dupe images (by path) and citations (by pdf+page)
+        seen_paths = set(); imgs = []
+        for im in p["images"]:
+            if im["path"] not in seen_paths:
+                imgs.append(im); seen_paths.add(im["path"])
+        p["images"] = imgs
+
+        seen_cite = set(); cites = []
+        for c in p["citations"]:
+            key = (c["pdf"], c["page"])
+            if key not in seen_cite:
+                cites.append(c); seen_cite.add(key)
+        p["citations"] = cites
+
+# ---------- sharding ----------
+def shard_ranges(path: Path) -> list[tuple[int, int]]:
+    """
+    Byte ranges of raw_pages.jsonl, one per PDF: each starts at a PDF's first
+    _meta row (completion markers don't start a shard). Found by scanning the
+    bytes, without parsing any JSON.
+    """
+    size = path.stat().st_size
+    if size == 0:
+        return []
+    starts = [0]
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        pos = data.find(b'\n{"_meta"')
+        while pos != -1:
+            eol = data.find(b"\n", pos + 1)
+            if b'"done": true' not in data[pos + 1:eol if eol != -1 else size]:
+                starts.append(pos + 1)
+            pos = data.find(b'\n{"_meta"', pos + 1)
+    return list(zip(starts, starts[1:] + [size]))
+
+def parse_shard(task):
+    """Pool task: parse the byte range [start, end) of a raw_pages.jsonl file."""
+    path, start, end = task
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return parse_lines(line for line in data.split(b"\n") if line.strip())
+
+# ---------- shard cache ----------
+def parser_fingerprint() -> str:
+    """Changes whenever headings.yml or the parsing code does."""
+    h = hashlib.sha1(json.dumps(CFG["headings"], sort_keys=True).encode("utf-8"))
+    for src in (Path(__file__), Path(heading_scan.__file__)):
+        h.update(src.read_bytes())
+    return h.hexdigest()
+
+def shard_keys(raw: Path, ranges) -> list[str]:
+    fp = parser_fingerprint().encode("ascii")
+    keys = []
+    with open(raw, "rb") as f:
+        for a, b in ranges:
+            f.seek(a)
+            keys.append(hashlib.sha1(fp + f.read(b - a)).hexdigest())
+    return keys
+
+def load_shard(key: str):
+    with open(CACHE_DIR / f"{key}.pkl", "rb") as f:
+        return pickle.load(f)
+
+def save_shard(key: str, result):
+    tmp = CACHE_DIR / f"{key}.pkl.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, CACHE_DIR / f"{key}.pkl")
+
+def structure(raw: Path = RAW, workers: int = 1, use_cache: bool = True) -> dict:
+    """
+    Parse raw pages into tidied plant records (latin name -> record). Shards
+    whose bytes (and the parser) are unchanged come from the cache; the rest
+    are parsed, cached, and everything is merged again in input order.
+    """
+    ranges = shard_ranges(raw)
+    keys = shard_keys(raw, ranges)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    cached = {k for k in keys if (CACHE_DIR / f"{k}.pkl").exists()} if use_cache else set()
+    todo = [(str(raw), a, b) for (a, b), k in zip(ranges, keys) if k not in cached]
+    print(f"[i] {len(ranges) - len(todo)} of {len(ranges)} PDF shards unchanged, {len(todo)} to parse")
+
+    def in_order(parsed):
+        for k in keys:
+            if k in cached:
+                yield load_shard(k)
+            else:
+                result = next(parsed)
+                save_shard(k, result)
+                yield result
+
+    if workers <= 1 or len(todo) <= 1:
+        plants = merge_shards(tqdm(in_order(map(parse_shard, todo)), total=len(keys), desc="Structuring"))
+    else:
+        with multiprocessing.Pool(processes=workers) as pool:
+            parsed = pool.imap(parse_shard, todo)  # in input order, so the merge is deterministic
+            plants = merge_shards(tqdm(in_order(parsed), total=len(keys), desc="Structuring"))
+
+    # drop cache entries for shards that no longer exist
+    live = {f"{k}.pkl" for k in keys}
+    for f in CACHE_DIR.glob("*.pkl"):
+        if f.name not in live:
+            f.unlink()
+    tidy(plants)
+    return plants
+
+# ---------- main ----------
+def write_plants(plants: dict, outdir: Path = OUTDIR):
+    """
+    Write plant files (short, safe filenames), skipping files whose content is
+    unchanged and removing files of plants that are gone. Returns (written, removed).
+    """
+    outdir.mkdir(parents=True, exist_ok=True)
+    keep, written = set(), 0
+    for latin, obj in plants.items():
+        fn = safe_slug(latin, maxlen=80)
+        path = outdir.joinpath(f"{fn}.json")
+        text = json.dumps(obj, ensure_ascii=False, indent=2)
+        keep.add(path.name)
+        try:
+            if path.read_text(encoding="utf-8") == text:
+                continue
+        except FileNotFoundError:
+            pass
+        path.write_text(text, encoding="utf-8")
+        written += 1
+    removed = 0
+    for path in outdir.glob("*.json"):
+        if path.name not in keep:
+            path.unlink()
+            removed += 1
+    return written, removed
+
+def main():
+    ap = argparse.ArgumentParser(description="Structure raw pages into per-plant records")
+    ap.add_argument("--workers", type=int, default=1, help="Parse this many PDFs' pages in parallel (process pool)")
+    ap.add_argument("--full", action="store_true", help="Reparse every PDF instead of reusing build/structure_cache/")
+    ap.add_argument("--json", action="store_true", help="Also export build/plants/*.json (debugging, build_sqlite.py)")
+    args = ap.parse_args()
+
+    plants = structure(RAW, workers=args.workers, use_cache=not args.full)
+    # same order as build_sqlite.py's sorted glob, so new species get the same ids either way
+    order = sorted(plants, key=lambda latin: f"{safe_slug(latin, maxlen=80)}.json")
+    n_docs = build_db((plants[k] for k in order), DB)
+    print(f"[✓] Built SQLite at {DB} ({n_docs} species documents)")
+    if args.json:
+        written, removed = write_plants(plants)
+        print(f"[✓] {len(plants)} plant JSON files in build/plants/ ({written} written, {removed} removed)")
+
+if __name__ == "__main__":
+    main()